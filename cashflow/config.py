@@ -5,6 +5,9 @@ load_dotenv()
 
 # Cash Flow
 DB_PATH = "cash_flow.db"
+# Write-ahead logging is opt-in: it is persisted in the database file and only
+# works while every process using the file runs on the same host.
+DB_WAL_ENABLED = os.getenv("DB_WAL_ENABLED", "false").lower() in ("true", "1", "yes")
 
 # Backup
 BACKUP_ENABLED = os.getenv("BACKUP_ENABLED", "true").lower() in ("true", "1", "yes")
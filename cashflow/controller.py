@@ -5,6 +5,7 @@ from dateutil.relativedelta import relativedelta
 
 from cashflow import repository
 from cashflow import transactions
+from cashflow.database import transaction
 
 def _recalculate_and_update_budget(conn: sqlite3.Connection, budget_id: str, month_date: date):
     """
@@ -350,40 +351,41 @@ def process_transaction_conversion(conn: sqlite3.Connection, transaction_id: int
     """
     Orchestrates the conversion of a transaction or group of transactions
     from one type to another using a robust "collect, delete, heal, create" pattern.
+    The whole conversion is written as a single transaction.
     """
-    # 1. Identify the full transaction group
-    group_info = _get_transaction_group_info(conn, transaction_id)
+    with transaction(conn):
+        # 1. Identify the full transaction group
+        group_info = _get_transaction_group_info(conn, transaction_id)
     
-    # 2. Validate the conversion
-    if group_info["type"] == "subscription":
-        raise ValueError("Cannot convert a subscription-linked transaction.")
-
-    # 3. Collect Context: Find all unique budgets and months that will be affected
-    budgets_to_heal = set()
-    for sibling in group_info["siblings"]:
-        if sibling.get("budget"):
-            # Use date_payed as it determines the month the budget is in
-            budgets_to_heal.add((sibling["budget"], sibling["date_payed"]))
-
-    # 4. Delete: Remove all old transactions from the database directly
-    for sibling in group_info["siblings"]:
-        repository.delete_transaction(conn, sibling["id"])
-
-    # 5. Heal: After all deletions, recalculate every affected budget
-    for budget_id, month_date in budgets_to_heal:
-        _recalculate_and_update_budget(conn, budget_id, month_date)
-
-    # 6. Create: Generate the new transaction(s)
-    original_date = group_info["siblings"][0]["date_created"]
-    request = {
-        "type": conversion_details["target_type"],
-        "account": conversion_details["account"],
-        **conversion_details
-    }
-    process_transaction_request(conn, request, transaction_date=original_date)
-
-
-def process_budget_update(conn: sqlite3.Connection, budget_id: str, updates: Dict[str, Any], retroactive: bool = False):
+        # 2. Validate the conversion
+        if group_info["type"] == "subscription":
+            raise ValueError("Cannot convert a subscription-linked transaction.")
+
+        # 3. Collect Context: Find all unique budgets and months that will be affected
+        budgets_to_heal = set()
+        for sibling in group_info["siblings"]:
+            if sibling.get("budget"):
+                # Use date_payed as it determines the month the budget is in
+                budgets_to_heal.add((sibling["budget"], sibling["date_payed"]))
+
+        # 4. Delete: Remove all old transactions from the database directly
+        repository.delete_transactions(conn, [sibling["id"] for sibling in group_info["siblings"]])
+
+        # 5. Heal: After all deletions, recalculate every affected budget
+        for budget_id, month_date in budgets_to_heal:
+            _recalculate_and_update_budget(conn, budget_id, month_date)
+
+        # 6. Create: Generate the new transaction(s)
+        original_date = group_info["siblings"][0]["date_created"]
+        request = {
+            "type": conversion_details["target_type"],
+            "account": conversion_details["account"],
+            **conversion_details
+        }
+        process_transaction_request(conn, request, transaction_date=original_date)
+
+
+def process_budget_update(conn: sqlite3.Connection, budget_id: str, updates: Dict[str, Any], retroactive: bool = False, update_date: date = None):
     """
     Updates a budget/subscription and regenerates forecasts if amount changes.
     Automatically renames the subscription ID when end_date is first set.
@@ -391,7 +393,11 @@ def process_budget_update(conn: sqlite3.Connection, budget_id: str, updates: Dic
     Args:
         retroactive: If True and amount changes, updates ALL past allocations (use for corrections).
                     If False (default), only updates current and future allocations (use for price changes).
+        update_date: The day the change takes effect; its month is treated as
+                    the current month. Defaults to today.
     """
+    current_month = (update_date or date.today()).replace(day=1)
+
     # Retrieve the current subscription
     subscription = repository.get_subscription_by_id(conn, budget_id)
     if not subscription:
@@ -433,7 +439,6 @@ def process_budget_update(conn: sqlite3.Connection, budget_id: str, updates: Dic
     # If amount changed, update allocations based on retroactive flag
     if 'monthly_amount' in updates:
         new_amount = updates['monthly_amount']
-        current_month = date.today().replace(day=1)
 
         # Determine sign based on whether this is income or expense
         is_income = subscription.get('is_income', False)
@@ -481,7 +486,6 @@ def process_budget_update(conn: sqlite3.Connection, budget_id: str, updates: Dic
     # If payment_account_id changed, update future forecasts
     if 'payment_account_id' in updates:
         new_account = updates['payment_account_id']
-        current_month = date.today().replace(day=1)
         next_month = current_month + relativedelta(months=1)
         repository.update_future_forecasts_account(conn, budget_id, next_month, new_account)
         print(f"Updated payment account to '{new_account}' for future transactions")
@@ -765,15 +769,11 @@ def generate_forecasts(conn: sqlite3.Connection, horizon_months: int, from_date:
     horizon_date = today + relativedelta(months=horizon_months)
     
     active_subscriptions = repository.get_all_active_subscriptions(conn, today, horizon_date)
-    all_transactions = repository.get_all_transactions(conn)
+    last_forecast_dates = repository.get_last_forecast_dates(conn)
 
     for sub in active_subscriptions:
         # Find the last forecast date for this subscription
-        last_forecast_date = None
-        for t in reversed(all_transactions):
-            if t['origin_id'] == sub['id'] and t['status'] in ('forecast', 'committed'):
-                last_forecast_date = t['date_created']
-                break
+        last_forecast_date = last_forecast_dates.get(sub['id'])
         
         # Determine the start period for generating new forecasts
         if last_forecast_date:
@@ -886,80 +886,96 @@ def run_monthly_rollover(conn: sqlite3.Connection, process_date: date):
     repository.commit_past_and_current_forecasts(conn, process_date)
 
 
+def run_monthly_rollover_range(conn: sqlite3.Connection, start_date: date, end_date: date):
+    """
+    Catches up on several missed months at once: runs the monthly rollover
+    for start_date and every month after it, on the same day of the month,
+    through end_date. All months are written as a single transaction.
+    """
+    with transaction(conn):
+        months = 0
+        process_date = start_date
+        while process_date <= end_date:
+            run_monthly_rollover(conn, process_date)
+            months += 1
+            process_date = start_date + relativedelta(months=months)
+
+
 def process_transaction_date_update(conn: sqlite3.Connection, transaction_id: int, new_date: date, updates: Dict[str, Any] = None):
     """
     Handles the complex logic of changing a transaction's date, ensuring
     payment dates and budget allocations are correctly recalculated using a
     "delete and re-create" pattern. It can also apply other updates simultaneously.
+    The whole change is written as a single transaction.
     """
     updates = updates or {}
-    # 1. Identify the full transaction group
-    group_info = _get_transaction_group_info(conn, transaction_id)
+    with transaction(conn):
+        # 1. Identify the full transaction group
+        group_info = _get_transaction_group_info(conn, transaction_id)
     
-    # Validate the operation
-    if group_info["type"] == "subscription":
-        raise ValueError("Cannot change the date of a subscription-linked transaction directly.")
+        # Validate the operation
+        if group_info["type"] == "subscription":
+            raise ValueError("Cannot change the date of a subscription-linked transaction directly.")
 
-    # 2. Collect Context from the original transaction(s) before deletion
-    original_siblings = group_info["siblings"]
-    first_sibling = original_siblings[0]
+        # 2. Collect Context from the original transaction(s) before deletion
+        original_siblings = group_info["siblings"]
+        first_sibling = original_siblings[0]
     
-    # This context will be used to re-create the transaction
-    recreation_context = {
-        "account": first_sibling["account"],
-        "budget": first_sibling.get("budget"),
-        "category": first_sibling.get("category"),
-    }
-
-    # Specifics for transaction type
-    if group_info["type"] == "simple":
-        recreation_context["type"] = "simple"
-        recreation_context["description"] = first_sibling["description"]
-        recreation_context["amount"] = abs(first_sibling["amount"])
+        # This context will be used to re-create the transaction
+        recreation_context = {
+            "account": first_sibling["account"],
+            "budget": first_sibling.get("budget"),
+            "category": first_sibling.get("category"),
+        }
+
+        # Specifics for transaction type
+        if group_info["type"] == "simple":
+            recreation_context["type"] = "simple"
+            recreation_context["description"] = first_sibling["description"]
+            recreation_context["amount"] = abs(first_sibling["amount"])
     
-    elif group_info["type"] == "installment":
-        # For installments, we need to find the total amount and count
-        total_amount = sum(abs(t["amount"]) for t in original_siblings)
-        installments = len(original_siblings)
-        # Description needs to be stripped of the "(1/N)" part
-        description = first_sibling["description"].split('(')[0].strip()
-
-        recreation_context["type"] = "installment"
-        recreation_context["description"] = description
-        recreation_context["total_amount"] = total_amount
-        recreation_context["installments"] = installments
+        elif group_info["type"] == "installment":
+            # For installments, we need to find the total amount and count
+            total_amount = sum(abs(t["amount"]) for t in original_siblings)
+            installments = len(original_siblings)
+            # Description needs to be stripped of the "(1/N)" part
+            description = first_sibling["description"].split('(')[0].strip()
+
+            recreation_context["type"] = "installment"
+            recreation_context["description"] = description
+            recreation_context["total_amount"] = total_amount
+            recreation_context["installments"] = installments
     
-    elif group_info["type"] == "split":
-        # Re-create the splits array
-        splits = [
-            {
-                "amount": abs(t["amount"]),
-                "category": t["category"],
-                "budget": t.get("budget")
-            }
-            for t in original_siblings
-        ]
-        recreation_context["type"] = "split"
-        recreation_context["description"] = first_sibling["description"]
-        recreation_context["splits"] = splits
-
-    # Apply any additional updates provided
-    recreation_context.update(updates)
-
-    # 3. Heal: Identify affected budgets, delete old transactions, and recalculate
-    budgets_to_heal = set()
-    for sibling in original_siblings:
-        if sibling.get("budget"):
-            budgets_to_heal.add((sibling["budget"], sibling["date_payed"]))
-
-    for sibling in original_siblings:
-        repository.delete_transaction(conn, sibling["id"])
-
-    for budget_id, month_date in budgets_to_heal:
-        _recalculate_and_update_budget(conn, budget_id, month_date)
-
-    # 4. Re-create: Generate the new transaction(s) with the new date
-    process_transaction_request(conn, recreation_context, transaction_date=new_date)
+        elif group_info["type"] == "split":
+            # Re-create the splits array
+            splits = [
+                {
+                    "amount": abs(t["amount"]),
+                    "category": t["category"],
+                    "budget": t.get("budget")
+                }
+                for t in original_siblings
+            ]
+            recreation_context["type"] = "split"
+            recreation_context["description"] = first_sibling["description"]
+            recreation_context["splits"] = splits
+
+        # Apply any additional updates provided
+        recreation_context.update(updates)
+
+        # 3. Heal: Identify affected budgets, delete old transactions, and recalculate
+        budgets_to_heal = set()
+        for sibling in original_siblings:
+            if sibling.get("budget"):
+                budgets_to_heal.add((sibling["budget"], sibling["date_payed"]))
+
+        repository.delete_transactions(conn, [sibling["id"] for sibling in original_siblings])
+
+        for budget_id, month_date in budgets_to_heal:
+            _recalculate_and_update_budget(conn, budget_id, month_date)
+
+        # 4. Re-create: Generate the new transaction(s) with the new date
+        process_transaction_request(conn, recreation_context, transaction_date=new_date)
 
 
 if __name__ == '__main__':
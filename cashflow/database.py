@@ -1,8 +1,11 @@
 
 import sqlite3
+from contextlib import contextmanager
 from sqlite3 import Connection
 from datetime import date
 
+from cashflow import config
+
 def adapt_date_iso(d: date):
     """Adapt date to ISO 8601 string format."""
     return d.isoformat()
@@ -15,14 +18,112 @@ def convert_date(s: bytes):
 sqlite3.register_adapter(date, adapt_date_iso)
 sqlite3.register_converter("DATE", convert_date)
 
+# sqlite3 keeps compiled statements keyed by their SQL text. The repository
+# issues a few dozen distinct queries, so the default of 128 is raised to keep
+# every one of them hot for the lifetime of a connection.
+STATEMENT_CACHE_SIZE = 256
+
+class CashflowConnection(Connection):
+    """
+    A connection whose commits can be deferred by ``transaction()``.
+
+    Repository functions commit after each write. While a ``transaction()``
+    block is open those commits are held back, so the block's writes are
+    committed or rolled back together.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.transaction_depth = 0
+
+    def commit(self):
+        if self.transaction_depth == 0:
+            super().commit()
+
+# In-memory databases never reach a disk, so there is nothing to sync, and
+# temporary b-trees (sorts, GROUP BY) can stay in RAM as well. Their journal
+# is already kept in memory by SQLite.
+_IN_MEMORY_PRAGMAS = """
+    PRAGMA synchronous = OFF;
+    PRAGMA temp_store = MEMORY;
+"""
+
+# On-disk databases use SQLite's default rollback journal unless
+# DB_WAL_ENABLED is set. WAL relies on shared memory, so it breaks when the
+# file is shared across hosts or through VM file mounts (e.g. Docker Desktop
+# on macOS/Windows). When it is enabled, synchronous=NORMAL is safe and only
+# syncs at checkpoints. The journal mode is stored in the database file, so
+# with the flag off a file left in WAL mode is switched back to DELETE.
+_WAL_PRAGMAS = """
+    PRAGMA journal_mode = WAL;
+    PRAGMA synchronous = NORMAL;
+"""
+
 def create_connection(db_path: str) -> Connection:
     """
     Establishes and returns a connection to the SQLite database file.
     """
-    conn = sqlite3.connect(db_path, detect_types=sqlite3.PARSE_DECLTYPES)
+    conn = sqlite3.connect(
+        db_path,
+        detect_types=sqlite3.PARSE_DECLTYPES,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        factory=CashflowConnection,
+    )
     conn.row_factory = sqlite3.Row
+    if db_path == ":memory:":
+        conn.executescript(_IN_MEMORY_PRAGMAS)
+    elif config.DB_WAL_ENABLED:
+        conn.executescript(_WAL_PRAGMAS)
+    else:
+        try:
+            conn.execute("PRAGMA journal_mode = DELETE")
+        except sqlite3.OperationalError:
+            pass  # another connection still has the file open in WAL mode
     return conn
 
+@contextmanager
+def transaction(conn: CashflowConnection, rollback: bool = False):
+    """
+    Runs every write made inside the block as a single transaction.
+
+    Commits issued inside the block are deferred until the outermost block
+    exits, which commits once. If the block raises, or ``rollback`` is True,
+    its writes are rolled back instead. Nested blocks run in a savepoint, so
+    they can be rolled back on their own without discarding the outer writes.
+    """
+    if not isinstance(conn, CashflowConnection):
+        raise TypeError(
+            "transaction() needs a connection opened with create_connection(), "
+            f"got {type(conn).__name__}"
+        )
+    savepoint = f"cashflow_{conn.transaction_depth}"
+    if conn.transaction_depth == 0:
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+    else:
+        conn.execute(f"SAVEPOINT {savepoint}")
+    conn.transaction_depth += 1
+    try:
+        yield conn
+    except BaseException:
+        conn.transaction_depth -= 1
+        _end_transaction(conn, savepoint, rollback=True)
+        raise
+    conn.transaction_depth -= 1
+    _end_transaction(conn, savepoint, rollback)
+
+def _end_transaction(conn: CashflowConnection, savepoint: str, rollback: bool):
+    """Commits or rolls back the block that has just been closed."""
+    if conn.transaction_depth == 0:
+        if rollback:
+            conn.rollback()
+        else:
+            conn.commit()
+    else:
+        if rollback:
+            conn.execute(f"ROLLBACK TO {savepoint}")
+        conn.execute(f"RELEASE {savepoint}")
+
 def create_tables(conn: Connection):
     """
     Creates the 'accounts' and 'transactions' tables if they do not already exist.
@@ -51,6 +152,10 @@ def create_tables(conn: Connection):
             FOREIGN KEY (payment_account_id) REFERENCES accounts (account_id)
         )
     """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_subscriptions_active_range
+        ON subscriptions (start_date, end_date)
+    """)
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS transactions (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -68,6 +173,29 @@ def create_tables(conn: Connection):
             FOREIGN KEY (account) REFERENCES accounts (account_id)
         )
     """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_transactions_description
+        ON transactions (description)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_transactions_date_payed
+        ON transactions (date_payed)
+    """)
+    # Budget and subscription maintenance looks rows up by their origin and
+    # creation date, budget totals by budget and payment date; rollovers only
+    # ever scan the (few) forecast rows.
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_transactions_origin_date
+        ON transactions (origin_id, date_created)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_transactions_budget_date_payed
+        ON transactions (budget, date_payed)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_transactions_forecast_date_payed
+        ON transactions (date_payed) WHERE status = 'forecast'
+    """)
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS settings (
             key TEXT PRIMARY KEY,
@@ -107,17 +235,36 @@ def ensure_schema_upgrades(conn: Connection):
             pass  # column already exists
     conn.commit()
 
+MOCK_ACCOUNTS = [
+    ("Cash", "cash", None, None),
+    ("Visa Produbanco", "credit_card", 14, 25),
+    ("Amex Produbanco", "credit_card", 2, 15),
+]
+
+DEFAULT_CATEGORIES = [
+    ("Housing", "Rent, mortgage, utilities, and home maintenance"),
+    ("Home Groceries", "Food and household items for home"),
+    ("Personal Groceries", "Food for personal diet or specific needs"),
+    ("Dining-Snacks", "Eating out, takeout, coffee, and social food/drinks"),
+    ("Transportation", "Costs for getting around"),
+    ("Health", "Medical, insurance, and fitness expenses"),
+    ("Personal", "Discretionary spending, entertainment, hobbies, self-care"),
+    ("Income", "Money received from work or investments"),
+    ("Savings", "Funds for savings or investments"),
+    ("Loans", "Money lent to others and repayments received"),
+    ("Others", "Miscellaneous or infrequent expenses"),
+]
+
+DEFAULT_SETTINGS = [
+    ("forecast_horizon_months", "6"),
+]
+
 def insert_mock_data(conn: Connection):
     """
     Populates the 'accounts' table with mock data for demonstration.
     """
     cursor = conn.cursor()
-    accounts = [
-        ("Cash", "cash", None, None),
-        ("Visa Produbanco", "credit_card", 14, 25),
-        ("Amex Produbanco", "credit_card", 2, 15)
-    ]
-    cursor.executemany("INSERT OR IGNORE INTO accounts VALUES (?, ?, ?, ?)", accounts)
+    cursor.executemany("INSERT OR IGNORE INTO accounts VALUES (?, ?, ?, ?)", MOCK_ACCOUNTS)
     conn.commit()
 
 def initialize_categories(conn: Connection):
@@ -126,22 +273,37 @@ def initialize_categories(conn: Connection):
     Uses INSERT OR IGNORE to safely work with existing databases.
     """
     cursor = conn.cursor()
-    categories = [
-        ("Housing", "Rent, mortgage, utilities, and home maintenance"),
-        ("Home Groceries", "Food and household items for home"),
-        ("Personal Groceries", "Food for personal diet or specific needs"),
-        ("Dining-Snacks", "Eating out, takeout, coffee, and social food/drinks"),
-        ("Transportation", "Costs for getting around"),
-        ("Health", "Medical, insurance, and fitness expenses"),
-        ("Personal", "Discretionary spending, entertainment, hobbies, self-care"),
-        ("Income", "Money received from work or investments"),
-        ("Savings", "Funds for savings or investments"),
-        ("Loans", "Money lent to others and repayments received"),
-        ("Others", "Miscellaneous or infrequent expenses"),
-    ]
-    cursor.executemany("INSERT OR IGNORE INTO categories VALUES (?, ?)", categories)
+    cursor.executemany("INSERT OR IGNORE INTO categories VALUES (?, ?)", DEFAULT_CATEGORIES)
     conn.commit()
 
+def _sql_literal(value) -> str:
+    """Render a seed value as an SQL literal."""
+    if value is None:
+        return "NULL"
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return str(value)
+
+def _render_insert(table: str, rows) -> str:
+    """Render rows as a single multi-row INSERT OR IGNORE statement."""
+    values = ", ".join(
+        "(" + ", ".join(_sql_literal(value) for value in row) + ")" for row in rows
+    )
+    return f"INSERT OR IGNORE INTO {table} VALUES {values};"
+
+# The test seed never changes, so it is rendered once at import time and
+# loaded with a single executescript() call instead of row-by-row inserts.
+_TEST_SEED_SQL = "\n".join([
+    "BEGIN;",
+    _render_insert("accounts", MOCK_ACCOUNTS),
+    _render_insert("categories", DEFAULT_CATEGORIES),
+    _render_insert("settings", DEFAULT_SETTINGS),
+    "COMMIT;",
+])
+
+# Built on the first create_test_db() call and reused for the process lifetime.
+_test_template = None
+
 def create_test_db() -> Connection:
     """
     Creates a fully initialized in-memory database for testing.
@@ -159,14 +321,28 @@ def create_test_db() -> Connection:
 
     Settings:
         - forecast_horizon_months = 6
+
+    The schema and seed are built once per process; every call returns an
+    independent copy of that template.
+    """
+    global _test_template
+    if _test_template is None:
+        template = create_connection(":memory:")
+        create_tables(template)
+        template.executescript(_TEST_SEED_SQL)
+        _test_template = template
+    return clone_connection(_test_template)
+
+def clone_connection(source: Connection) -> Connection:
+    """
+    Copies an existing database into a fresh in-memory connection.
+
+    Uses SQLite's online backup API, which copies pages directly instead of
+    replaying the statements that built the source. Tests use this to build an
+    expensive scenario once and hand every test its own independent copy.
     """
     conn = create_connection(":memory:")
-    create_tables(conn)
-    insert_mock_data(conn)
-    initialize_categories(conn)
-    cursor = conn.cursor()
-    cursor.execute("INSERT OR IGNORE INTO settings VALUES ('forecast_horizon_months', '6')")
-    conn.commit()
+    source.backup(conn)
     return conn
 
 def initialize_database(db_path: str = "cash_flow.db"):
@@ -179,10 +355,7 @@ def initialize_database(db_path: str = "cash_flow.db"):
 
     # Insert default settings
     cursor = conn.cursor()
-    settings = [
-        ("forecast_horizon_months", "6")
-    ]
-    cursor.executemany("INSERT OR IGNORE INTO settings VALUES (?, ?)", settings)
+    cursor.executemany("INSERT OR IGNORE INTO settings VALUES (?, ?)", DEFAULT_SETTINGS)
 
     # Initialize predefined categories
     initialize_categories(conn)
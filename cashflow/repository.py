@@ -27,6 +27,8 @@ def add_transactions(conn: Connection, transactions: List[Dict[str, Any]]) -> Li
             category, budget, status, origin_id, source, needs_review
         ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
     """
+    # executemany() cannot report each row's id, so rows are inserted one at a
+    # time; the statement cache keeps the INSERT prepared across iterations.
     inserted_ids = []
     for t in transactions:
         cursor.execute(query, (
@@ -59,12 +61,21 @@ def save_llm_example(conn: Connection, user_input: str, parsed_json: dict, trans
 def get_all_transactions(conn: Connection) -> List[Dict[str, Any]]:
     """
     Retrieves all transactions from the database for display or export.
+
+    The connection already yields sqlite3.Row objects; they are converted to
+    plain dicts because callers (parser, UI, controller) rely on dict.get().
     """
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM transactions ORDER BY date_payed")
     transactions = cursor.fetchall()
     return [dict(row) for row in transactions]
 
+def count_transactions(conn: Connection) -> int:
+    """Returns the number of stored transactions without fetching them."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM transactions")
+    return cursor.fetchone()[0]
+
 def get_transaction_by_id(conn: Connection, transaction_id: int) -> Dict[str, Any]:
     """Retrieves a single transaction by its primary key."""
     cursor = conn.cursor()
@@ -75,6 +86,22 @@ def get_transaction_by_id(conn: Connection, transaction_id: int) -> Dict[str, An
     return None
 
 
+def get_transaction_by_description(conn: Connection, description: str) -> Dict[str, Any]:
+    """
+    Retrieves the earliest-paid transaction with an exact description match.
+    Served by the description index instead of scanning every transaction.
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT * FROM transactions WHERE description = ? ORDER BY date_payed LIMIT 1",
+        (description,),
+    )
+    transaction = cursor.fetchone()
+    if transaction:
+        return dict(transaction)
+    return None
+
+
 def get_transactions_by_origin_id(conn: Connection, origin_id: str) -> List[Dict[str, Any]]:
     """Retrieves all transactions sharing a common origin_id."""
     cursor = conn.cursor()
@@ -85,6 +112,13 @@ def get_transactions_by_origin_id(conn: Connection, origin_id: str) -> List[Dict
 
 def add_subscription(conn: Connection, sub: Dict[str, Any]):
     """Inserts a new record into the subscriptions table."""
+    add_subscriptions(conn, [sub])
+
+def add_subscriptions(conn: Connection, subs: List[Dict[str, Any]]):
+    """
+    Inserts one or more subscription records with a single prepared statement
+    and one commit.
+    """
     cursor = conn.cursor()
     query = """
         INSERT OR IGNORE INTO subscriptions (
@@ -93,23 +127,22 @@ def add_subscription(conn: Connection, sub: Dict[str, Any]):
         ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
     """
     # Set defaults if not provided
-    is_budget = sub.get("is_budget", 0)
-    underspend_behavior = sub.get("underspend_behavior", "keep")
-    is_income = sub.get("is_income", 0)
-
-    data = (
-        sub["id"],
-        sub["name"],
-        sub["category"],
-        sub["monthly_amount"],
-        sub["payment_account_id"],
-        sub["start_date"],
-        sub.get("end_date"),
-        is_budget,
-        underspend_behavior,
-        is_income,
-    )
-    cursor.execute(query, data)
+    rows = [
+        (
+            sub["id"],
+            sub["name"],
+            sub["category"],
+            sub["monthly_amount"],
+            sub["payment_account_id"],
+            sub["start_date"],
+            sub.get("end_date"),
+            sub.get("is_budget", 0),
+            sub.get("underspend_behavior", "keep"),
+            sub.get("is_income", 0),
+        )
+        for sub in subs
+    ]
+    cursor.executemany(query, rows)
     conn.commit()
 
 def get_subscription_by_id(conn: Connection, sub_id: str) -> Dict[str, Any]:
@@ -144,6 +177,7 @@ def get_all_active_subscriptions(conn: Connection, start_range: date, end_range:
     query = """
         SELECT * FROM subscriptions
         WHERE start_date <= ? AND (end_date IS NULL OR end_date >= ?)
+        ORDER BY start_date
     """
     cursor.execute(query, (end_range, start_range))
     subs = cursor.fetchall()
@@ -191,7 +225,7 @@ def get_budget_allocation_for_month(
     
     query = """
         SELECT * FROM transactions
-        WHERE origin_id = ? AND date(date_payed) BETWEEN ? AND ?
+        WHERE origin_id = ? AND date_payed BETWEEN ? AND ?
     """
     cursor.execute(query, (budget_id, start_of_month, end_of_month))
     allocation = cursor.fetchone()
@@ -199,6 +233,52 @@ def get_budget_allocation_for_month(
         return dict(allocation)
     return None
 
+def get_budget_allocations_for_months(
+    conn: Connection, budget_id: str, month_dates: List[date]
+) -> Dict[date, Dict[str, Any]]:
+    """
+    Retrieves a budget's allocation transactions for several months in one query.
+    Returns a dict keyed by the first day of each month; months without an
+    allocation are left out.
+    """
+    months = sorted({month_date.replace(day=1) for month_date in month_dates})
+    if not months:
+        return {}
+    placeholders = ", ".join("?" for _ in months)
+    query = f"""
+        SELECT * FROM transactions
+        WHERE origin_id = ? AND date(date_payed, 'start of month') IN ({placeholders})
+        ORDER BY id
+    """
+    cursor = conn.cursor()
+    cursor.execute(query, (budget_id, *months))
+    allocations = {}
+    for row in cursor.fetchall():
+        # Keep the first match per month, as get_budget_allocation_for_month does
+        allocations.setdefault(row["date_payed"].replace(day=1), dict(row))
+    return allocations
+
+def get_last_forecast_dates(conn: Connection) -> Dict[str, date]:
+    """
+    Retrieves, for every subscription that has any, the date_created of its
+    latest forecast or committed transaction, in one query. "Latest" follows
+    get_all_transactions' order (date_payed, then id).
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT origin_id, date_created FROM (
+            SELECT origin_id, date_created,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY origin_id ORDER BY date_payed DESC, id DESC
+                   ) AS position
+            FROM transactions
+            WHERE status IN ('forecast', 'committed')
+            AND origin_id IN (SELECT id FROM subscriptions)
+        )
+        WHERE position = 1
+    """)
+    return {row["origin_id"]: row["date_created"] for row in cursor.fetchall()}
+
 def get_total_spent_for_budget_in_month(
     conn: Connection, budget_id: str, month_date: date
 ) -> float:
@@ -215,7 +295,7 @@ def get_total_spent_for_budget_in_month(
     query = """
         SELECT SUM(amount) FROM transactions
         WHERE budget = ?
-        AND date(date_payed) BETWEEN ? AND ?
+        AND date_payed BETWEEN ? AND ?
         AND (origin_id IS NULL OR origin_id != ?)
         AND status != 'pending'
     """
@@ -241,7 +321,7 @@ def get_total_committed_for_budget_in_month(
         SELECT SUM(amount) FROM transactions
         WHERE budget = ?
         AND status = 'committed'
-        AND date(date_payed) BETWEEN ? AND ?
+        AND date_payed BETWEEN ? AND ?
         AND (origin_id IS NULL OR origin_id != ?)
     """
     cursor.execute(query, (budget_id, start_of_month, end_of_month, budget_id))
@@ -286,10 +366,13 @@ def commit_past_and_current_forecasts(conn: Connection, month_date: date):
     from dateutil.relativedelta import relativedelta
     end_of_month = (start_of_month + relativedelta(months=1)) - relativedelta(days=1)
 
+    # Dates are stored as ISO 'YYYY-MM-DD' text, which sorts chronologically,
+    # so date_payed is compared as-is; wrapping it in date() would keep
+    # SQLite from seeking idx_transactions_forecast_date_payed.
     query = """
         UPDATE transactions
         SET status = 'committed'
-        WHERE status = 'forecast' AND date(date_payed) <= ?
+        WHERE status = 'forecast' AND date_payed <= ?
     """
     cursor.execute(query, (end_of_month,))
     conn.commit()
@@ -312,6 +395,13 @@ def delete_transaction(conn: Connection, transaction_id: int):
     cursor.execute(query, (transaction_id,))
     conn.commit()
 
+def delete_transactions(conn: Connection, transaction_ids: List[int]):
+    """Permanently removes a batch of transactions in a single commit."""
+    cursor = conn.cursor()
+    query = "DELETE FROM transactions WHERE id = ?"
+    cursor.executemany(query, [(transaction_id,) for transaction_id in transaction_ids])
+    conn.commit()
+
 def get_transactions_with_running_balance(conn: Connection) -> List[Dict[str, Any]]:
     """
     Retrieves all transactions and calculates a cumulative running balance.
@@ -319,20 +409,19 @@ def get_transactions_with_running_balance(conn: Connection) -> List[Dict[str, An
     dynamically updated, ensuring the 'amount' column is always the source
     of truth for cash flow.
     """
-    transactions = get_all_transactions(conn) # Already sorted by date_payed
-    
-    running_balance = 0.0
-    processed_transactions = []
-
-    for t in transactions:
-        transaction_dict = dict(t)
-        # Only add to the balance if the transaction is not pending
-        if transaction_dict["status"] != "pending":
-            running_balance += transaction_dict["amount"]
-        transaction_dict["running_balance"] = running_balance
-        processed_transactions.append(transaction_dict)
-        
-    return processed_transactions
+    cursor = conn.cursor()
+    # The balance is accumulated by a window function in the same pass that
+    # reads the rows in date_payed order (id breaks ties, as the index does).
+    # Pending transactions do not move the balance.
+    cursor.execute("""
+        SELECT *,
+               TOTAL(CASE WHEN status != 'pending' THEN amount END) OVER (
+                   ORDER BY date_payed, id ROWS UNBOUNDED PRECEDING
+               ) AS running_balance
+        FROM transactions
+        ORDER BY date_payed, id
+    """)
+    return [dict(row) for row in cursor.fetchall()]
 
 
 def get_all_accounts(conn: Connection) -> List[Dict[str, Any]]:
@@ -1,14 +1,26 @@
-import uuid
-from datetime import date, timedelta
+import calendar
+import secrets
+from functools import lru_cache
+from datetime import date
 from typing import List, Dict, Any, Optional
-from dateutil.relativedelta import relativedelta
 
 
 def _generate_origin_id() -> str:
     """
     Creates a unique ID for linking related transactions.
     """
-    return f"{date.today().strftime('%Y%m%d')}-{uuid.uuid4().hex[:4].upper()}"
+    return f"{date.today():%Y%m%d}-{secrets.token_hex(2).upper()}"
+
+def _add_months(d: date, months: int) -> date:
+    """
+    Shifts a date by whole months, clamping the day to the end of shorter
+    months. Equivalent to ``d + relativedelta(months=months)``.
+    """
+    if not months:
+        return d  # The common case: no grace period, first installment
+    year, month = divmod(d.year * 12 + d.month - 1 + months, 12)
+    month += 1
+    return date(year, month, min(d.day, calendar.monthrange(year, month)[1]))
 
 def simulate_payment_date(account: Dict[str, Any], transaction_date: date) -> date:
     """
@@ -72,18 +84,22 @@ def calculate_payment_month(user_message: str, accounts: List[Dict[str, Any]]) -
     return None
 
 
+@lru_cache(maxsize=4096)
 def _calculate_credit_card_payment_date(
     transaction_date: date, cut_off_day: int, payment_day: int
 ) -> date:
     """
     Calculates the correct payment date for a credit card transaction by
     determining if it's a same-month or next-month payment cycle.
+
+    The result depends only on the arguments, so it is memoized: forecasts and
+    installment plans keep asking for the same handful of billing dates.
     """
     # Case 1: Same-month payment cycle (e.g., cut on 14th, pay on 25th)
     if payment_day > cut_off_day:
         if transaction_date.day >= cut_off_day:
             # Purchase is on or after cut-off, so it's on next month's bill
-            payment_date = transaction_date + relativedelta(months=1)
+            payment_date = _add_months(transaction_date, 1)
             return payment_date.replace(day=payment_day)
         else:
             # Purchase is before cut-off, so it's on this month's bill
@@ -93,11 +109,11 @@ def _calculate_credit_card_payment_date(
     else:  # payment_day <= cut_off_day
         if transaction_date.day > cut_off_day:
             # Purchase is after cut-off, bill is month+1, payment is month+2
-            payment_date = transaction_date + relativedelta(months=2)
+            payment_date = _add_months(transaction_date, 2)
             return payment_date.replace(day=payment_day)
         else:
             # Purchase is before cut-off, bill is this month, payment is month+1
-            payment_date = transaction_date + relativedelta(months=1)
+            payment_date = _add_months(transaction_date, 1)
             return payment_date.replace(day=payment_day)
 
 def _create_base_transaction(
@@ -113,6 +129,7 @@ def _create_base_transaction(
 ) -> Dict[str, Any]:
     """
     A private factory function to construct the common fields for any transaction.
+    The amount is stored as given: callers sign it (negative for expenses) first.
     """
     status = "committed"
     if is_pending:
@@ -157,7 +174,7 @@ def create_single_transaction(
     transaction["account"] = account.get("account_id")
 
     # Apply grace period if any
-    effective_date = transaction_date + relativedelta(months=grace_period_months)
+    effective_date = _add_months(transaction_date, grace_period_months)
 
     if account.get("account_type") == "credit_card":
         transaction["date_payed"] = _calculate_credit_card_payment_date(
@@ -197,36 +214,45 @@ def create_installment_transactions(
     installment_amount = round(total_amount / final_total_installments, 2)
     final_amount = abs(installment_amount) if is_income else -abs(installment_amount)
     
+    # Never create more installments than the plan has left.
+    if total_installments is not None:
+        installments = min(installments, total_installments - start_from_installment + 1)
+
+    account_id = account.get("account_id")
+    is_credit_card = account.get("account_type") == "credit_card"
+    if is_credit_card:
+        cut_off_day, payment_day = account["cut_off_day"], account["payment_day"]
     transactions = []
 
+    # Only the installment number varies in the description
+    description_prefix = f"{description} ("
+    description_suffix = f"/{final_total_installments})"
+
+    # Installments differ only in description and payment date, so each one
+    # starts as a copy of a shared template
+    template = _create_base_transaction(
+        description=description,
+        amount=final_amount,
+        category=category,
+        budget=budget,
+        transaction_date=transaction_date, # The purchase date is the same for all
+        is_pending=is_pending,
+        is_planning=is_planning,
+        source=source,
+        needs_review=needs_review,
+    )
+    template["account"] = account_id
+    template["origin_id"] = origin_id
+
     for i in range(installments):
-        current_installment_num = start_from_installment + i
-        
-        # Safety break to prevent creating more installments than the plan allows.
-        if total_installments is not None and current_installment_num > total_installments:
-            break
-            
-        installment_description = f"{description} ({current_installment_num}/{final_total_installments})"
-        
-        future_billing_date = transaction_date + relativedelta(months=i + grace_period_months)
+        future_billing_date = _add_months(transaction_date, i + grace_period_months)
 
-        transaction = _create_base_transaction(
-            description=installment_description,
-            amount=final_amount,
-            category=category,
-            budget=budget,
-            transaction_date=transaction_date, # The purchase date is the same for all
-            is_pending=is_pending,
-            is_planning=is_planning,
-            source=source,
-            needs_review=needs_review,
-        )
-        transaction["account"] = account.get("account_id")
-        transaction["origin_id"] = origin_id
+        transaction = template.copy()
+        transaction["description"] = f"{description_prefix}{start_from_installment + i}{description_suffix}"
 
-        if account.get("account_type") == "credit_card":
+        if is_credit_card:
             transaction["date_payed"] = _calculate_credit_card_payment_date(
-                future_billing_date, account["cut_off_day"], account["payment_day"]
+                future_billing_date, cut_off_day, payment_day
             )
         else:
             transaction["date_payed"] = future_billing_date
@@ -250,21 +276,19 @@ def create_split_transactions(
     Generates a list of transactions for a split purchase.
     """
     origin_id = _generate_origin_id()
+    # Every split shares the account and purchase date, so they all share
+    # one payment date as well
+    account_id = account.get("account_id")
+    date_payed = simulate_payment_date(account, transaction_date)
     transactions = []
     for split in splits:
-        transaction = create_single_transaction(
-            description=description,
-            amount=split["amount"],
-            category=split["category"],
-            budget=split.get("budget"),
-            account=account,
-            transaction_date=transaction_date,
-            is_income=is_income,
-            is_pending=is_pending,
-            is_planning=is_planning,
-            source=source,
-            needs_review=needs_review,
+        amount = abs(split["amount"]) if is_income else -abs(split["amount"])
+        transaction = _create_base_transaction(
+            description, amount, split["category"], split.get("budget"), transaction_date,
+            is_pending, is_planning, source=source, needs_review=needs_review,
         )
+        transaction["account"] = account_id
+        transaction["date_payed"] = date_payed
         transaction["origin_id"] = origin_id
         transactions.append(transaction)
     return transactions
@@ -281,45 +305,52 @@ def create_recurrent_transactions(
     subscription over a specified period.
     """
     transactions = []
-    current_date = start_period
     initial_amounts = initial_amounts or {}
-
-    while current_date <= end_period:
-        # Set the transaction day to the subscription's start day
-        transaction_day = subscription["start_date"].day
+    # Set the transaction day to the subscription's start day
+    transaction_day = subscription["start_date"].day
+    # Every forecast shares these fields; read them once
+    name, category = subscription["name"], subscription["category"]
+    default_amount = subscription["monthly_amount"]
+    is_income = subscription.get("is_income", False)
+    origin_id = subscription["id"]
+    budget = origin_id if subscription.get("is_budget") else None
+
+    # Walk every month the period touches; the first of each month is offset
+    # from the first month, so late start days never skip the last month
+    first_month = start_period.replace(day=1)
+    months = 0
+    period_date = first_month
+
+    while period_date <= end_period:
+        year, month = period_date.year, period_date.month
         # handle cases where the day is invalid for the month (e.g. 31 in Feb)
-        try:
-            transaction_date = date(current_date.year, current_date.month, transaction_day)
-        except ValueError:
-            # This logic gets the last day of the month
-            transaction_date = date(current_date.year, current_date.month + 1, 1) - timedelta(days=1)
-
+        last_day = calendar.monthrange(year, month)[1]
+        transaction_date = date(year, month, min(transaction_day, last_day))
 
         if transaction_date >= start_period and transaction_date <= end_period:
             # For budgets, check if there's a pre-calculated starting amount
-            month_key = transaction_date.strftime("%Y-%m")
-            amount = initial_amounts.get(month_key, subscription["monthly_amount"])
+            month_key = f"{year:04d}-{month:02d}"
+            amount = initial_amounts.get(month_key, default_amount)
 
             trans = create_single_transaction(
-                description=subscription["name"],
+                description=name,
                 amount=amount,
-                category=subscription["category"],
-                budget=None,  # Default to None
+                category=category,
+                budget=budget,  # Only budgets link their forecasts to themselves
                 account=account,
                 transaction_date=transaction_date,
-                is_income=subscription.get("is_income", False),
+                is_income=is_income,
             )
             
             # Override fields for forecast
             trans["status"] = "forecast"
-            trans["origin_id"] = subscription["id"]
-            if subscription.get("is_budget"):
-                trans["budget"] = subscription["id"]
+            trans["origin_id"] = origin_id
             
             transactions.append(trans)
 
-        current_date += relativedelta(months=1)
-        
+        months += 1
+        period_date = _add_months(first_month, months)
+
     return transactions
 
 def create_budget_release_transaction(
@@ -0,0 +1,17 @@
+import unittest
+from contextlib import ExitStack
+
+from cashflow.database import transaction
+
+
+class RollbackTestCase(unittest.TestCase):
+    """
+    Base class for tests that share one database, built in setUpClass as
+    ``cls.conn``. Each test runs inside a ``transaction(rollback=True)`` block,
+    so whatever it writes is discarded and the next test sees the seed again.
+    """
+
+    def setUp(self):
+        stack = ExitStack()
+        stack.enter_context(transaction(self.conn, rollback=True))
+        self.addCleanup(stack.close)
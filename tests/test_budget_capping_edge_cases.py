@@ -5,7 +5,7 @@ from dateutil.relativedelta import relativedelta
 from cashflow.database import create_test_db
 from cashflow.repository import (
     add_subscription, add_transactions, get_budget_allocation_for_month,
-    get_all_transactions
+    get_transaction_by_description
 )
 from cashflow.controller import (
     process_transaction_request, process_transaction_conversion,
@@ -67,7 +67,7 @@ class TestBudgetCappingEdgeCases(unittest.TestCase):
         self.assertAlmostEqual(budget_after_installment['amount'], 0, msg="Budget should remain capped at 0.")
 
         # --- STEP 3: Convert the installment back to a simple transaction ---
-        tx_to_convert = next(t for t in get_all_transactions(self.conn) if "Gadget" in t['description'])
+        tx_to_convert = get_transaction_by_description(self.conn, "Gadget (1/3)")
         conversion_details = {
             "target_type": "simple", "description": "Gadget (Simple)", "amount": 60.00,
             "account": "Cash", "category": "Others", "budget": self.budget_id
@@ -101,7 +101,7 @@ class TestBudgetCappingEdgeCases(unittest.TestCase):
         self.assertAlmostEqual(budget_after_overspend['amount'], 0, msg="Budget should be capped at 0.")
 
         # --- STEP 2: Convert the large transaction to installments ---
-        tx_to_convert = next(t for t in get_all_transactions(self.conn) if t['description'] == "Big Purchase")
+        tx_to_convert = get_transaction_by_description(self.conn, "Big Purchase")
         conversion_details = {
             "target_type": "installment", "description": "Big Purchase (Installments)",
             "total_amount": 150.00, "installments": 3, "account": "Cash",
@@ -137,7 +137,7 @@ class TestBudgetCappingEdgeCases(unittest.TestCase):
         self.assertAlmostEqual(budget_after_overspend['amount'], 0, msg="Budget should be capped at 0.")
 
         # --- STEP 2: Delete one of the transactions ---
-        tx_to_delete = next(t for t in get_all_transactions(self.conn) if t['description'] == "Expense 1")
+        tx_to_delete = get_transaction_by_description(self.conn, "Expense 1")
         process_transaction_deletion(self.conn, tx_to_delete['id'])
 
         # --- STEP 3: Verification ---
@@ -1,11 +1,9 @@
 import unittest
 from datetime import date
-from unittest.mock import patch
-from dateutil.relativedelta import relativedelta
 
 from cashflow.database import create_test_db
 from cashflow.repository import (
-    add_subscription, get_budget_allocation_for_month, get_all_transactions,
+    add_subscription, get_budget_allocation_for_month, get_transaction_by_description,
     get_account_by_name
 )
 from cashflow.controller import (
@@ -19,7 +17,7 @@ class TestBudgetCappingOnDateChange(unittest.TestCase):
         
         self.today = date(2025, 10, 15)
         self.october = self.today
-        self.november = self.today + relativedelta(months=1)
+        self.november = date(2025, 11, 15)
 
         # Create a Transport budget
         self.budget_id = "budget_transport"
@@ -30,10 +28,8 @@ class TestBudgetCappingOnDateChange(unittest.TestCase):
         })
 
         # Generate forecasts and commit months
-        with patch('cashflow.controller.date') as mock_date:
-            mock_date.today.return_value = self.today
-            run_monthly_rollover(self.conn, self.october)
-            run_monthly_rollover(self.conn, self.november)
+        run_monthly_rollover(self.conn, self.october)
+        run_monthly_rollover(self.conn, self.november)
 
         self.account = get_account_by_name(self.conn, "Visa Produbanco")
 
@@ -71,7 +67,7 @@ class TestBudgetCappingOnDateChange(unittest.TestCase):
 
         # --- Date Change: Move the $40 transaction to the next payment cycle ---
         print("\nSTEP 2: Moving the $40 transaction to the November cycle.")
-        tx_to_move = next(t for t in get_all_transactions(self.conn) if t['description'] == "Uber Ride")
+        tx_to_move = get_transaction_by_description(self.conn, "Uber Ride")
         
         # New date of Oct 15th pushes its payment date to November
         process_transaction_date_update(self.conn, tx_to_move['id'], date(2025, 10, 15))
@@ -119,7 +115,7 @@ class TestBudgetCappingOnDateChange(unittest.TestCase):
 
         # --- Date Change: Move the $40 transaction back to the October payment cycle ---
         print("\nSTEP 2: Moving the $40 transaction to the October cycle.")
-        tx_to_move = next(t for t in get_all_transactions(self.conn) if t['description'] == "Uber Ride")
+        tx_to_move = get_transaction_by_description(self.conn, "Uber Ride")
         
         # New date of Oct 12th pulls its payment date back to October
         process_transaction_date_update(self.conn, tx_to_move['id'], date(2025, 10, 12))
@@ -1,9 +1,7 @@
 import unittest
 from datetime import date
-from unittest.mock import patch
-from dateutil.relativedelta import relativedelta
 
-from cashflow.database import create_test_db
+from cashflow.database import create_test_db, clone_connection
 from cashflow.repository import (
     add_subscription, get_all_transactions, get_subscription_by_id,
     get_budget_allocation_for_month, commit_past_and_current_forecasts
@@ -11,38 +9,46 @@ from cashflow.repository import (
 from cashflow.controller import generate_forecasts, process_transaction_request, process_budget_update
 
 class TestBudgetUpdate(unittest.TestCase):
-    def setUp(self):
-        """Set up a consistent scenario for testing budget updates."""
-        self.conn = create_test_db()
-        self.today = date(2025, 10, 10)
-        self.current_month = self.today.replace(day=1)
-        self.next_month = (self.today + relativedelta(months=1)).replace(day=1)
+    @classmethod
+    def setUpClass(cls):
+        """
+        Build the budget scenario once; forecast generation is the expensive
+        part of the setup and is identical for every test in this class.
+        """
+        cls.today = date(2025, 10, 10)
+        cls.current_month = date(2025, 10, 1)
+        cls.next_month = date(2025, 11, 1)
+        cls.budget_id = "budget_shopping"
+        cls._template = create_test_db()
 
         # 1. Create a "Others" budget subscription
-        self.budget_id = "budget_shopping"
         shopping_budget = {
-            "id": self.budget_id, "name": "Shopping Budget", "category": "Others",
+            "id": cls.budget_id, "name": "Shopping Budget", "category": "Others",
             "monthly_amount": 200.00, "payment_account_id": "Visa Produbanco",
-            "start_date": self.today - relativedelta(months=2), "is_budget": True
+            "start_date": date(2025, 8, 10), "is_budget": True
         }
-        add_subscription(self.conn, shopping_budget)
+        add_subscription(cls._template, shopping_budget)
 
         # 2. Generate forecasts for the next 6 months
-        with patch('cashflow.controller.date') as mock_date:
-            mock_date.today.return_value = self.today
-            generate_forecasts(self.conn, 6)
+        generate_forecasts(cls._template, 6, from_date=cls.today)
 
         # 3. Commit the current month's forecast to make it "live"
-        commit_past_and_current_forecasts(self.conn, self.current_month)
+        commit_past_and_current_forecasts(cls._template, cls.current_month)
 
         # 4. Log an expense against the current month's budget
         expense_request = {
             "type": "simple", "description": "New Shoes", "amount": 50.00,
-            "account": "Visa Produbanco", "budget": self.budget_id
+            "account": "Visa Produbanco", "budget": cls.budget_id
         }
-        with patch('cashflow.controller.date') as mock_date:
-            mock_date.today.return_value = self.today
-            process_transaction_request(self.conn, expense_request)
+        process_transaction_request(cls._template, expense_request, transaction_date=cls.today)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._template.close()
+
+    def setUp(self):
+        """Give each test its own copy of the prepared scenario."""
+        self.conn = clone_connection(self._template)
 
     def tearDown(self):
         self.conn.close()
@@ -53,9 +59,7 @@ class TestBudgetUpdate(unittest.TestCase):
         It should update the live balance and all future forecasts.
         """
         # Action: Increase budget from 200 to 300, effective this month
-        with patch('cashflow.controller.date') as mock_date:
-            mock_date.today.return_value = self.today
-            process_budget_update(self.conn, self.budget_id, {"monthly_amount": 300.00})
+        process_budget_update(self.conn, self.budget_id, {"monthly_amount": 300.00}, update_date=self.today)
 
         # Assertion 1: The subscription definition is updated
         sub = get_subscription_by_id(self.conn, self.budget_id)
@@ -78,9 +82,7 @@ class TestBudgetUpdate(unittest.TestCase):
         It should NOT affect the current month's live balance.
         """
         # Action: Increase budget from 200 to 250
-        with patch('cashflow.controller.date') as mock_date:
-            mock_date.today.return_value = self.today
-            process_budget_update(self.conn, self.budget_id, {"monthly_amount": 250.00})
+        process_budget_update(self.conn, self.budget_id, {"monthly_amount": 250.00}, update_date=self.today)
 
         # Assertion 1: The subscription definition is updated
         sub = get_subscription_by_id(self.conn, self.budget_id)
@@ -100,9 +102,7 @@ class TestBudgetUpdate(unittest.TestCase):
         Tests decreasing a budget for the current month, causing it to become overspent.
         """
         # Action: Decrease budget from 200 to 40 (less than the 50 already spent)
-        with patch('cashflow.controller.date') as mock_date:
-            mock_date.today.return_value = self.today
-            process_budget_update(self.conn, self.budget_id, {"monthly_amount": 40.00})
+        process_budget_update(self.conn, self.budget_id, {"monthly_amount": 40.00}, update_date=self.today)
 
         # Assertion 1: The subscription is updated
         sub = get_subscription_by_id(self.conn, self.budget_id)
@@ -126,18 +126,14 @@ class TestBudgetUpdate(unittest.TestCase):
             "type": "simple", "description": "Luxury Item", "amount": 200.00,
             "account": "Visa Produbanco", "budget": self.budget_id
         }
-        with patch('cashflow.controller.date') as mock_date:
-            mock_date.today.return_value = self.today
-            process_transaction_request(self.conn, over_expense)
+        process_transaction_request(self.conn, over_expense, transaction_date=self.today)
         
         # Initial state check: budget is 200, spent is 250. Allocation should be 0.
         allocation_before = get_budget_allocation_for_month(self.conn, self.budget_id, self.current_month)
         self.assertAlmostEqual(allocation_before['amount'], 0)
 
         # 2. Action: Decrease budget from 200 to 150
-        with patch('cashflow.controller.date') as mock_date:
-            mock_date.today.return_value = self.today
-            process_budget_update(self.conn, self.budget_id, {"monthly_amount": 150.00})
+        process_budget_update(self.conn, self.budget_id, {"monthly_amount": 150.00}, update_date=self.today)
 
         # 3. Assertions
         sub = get_subscription_by_id(self.conn, self.budget_id)
@@ -156,42 +152,40 @@ if __name__ == "__main__":
 
 
 class TestFutureDatedBudgetUpdate(unittest.TestCase):
-    def setUp(self):
+    @classmethod
+    def setUpClass(cls):
         """Set up a scenario where an expense is pushed to a future budget."""
-        self.conn = create_test_db()
         # Transaction date is AFTER the Visa cut-off day (14th)
-        self.today = date(2025, 10, 15)
-        self.current_month = self.today.replace(day=1)
-        self.next_month = (self.today + relativedelta(months=1)).replace(day=1)
-        self.month_after_next = (self.today + relativedelta(months=2)).replace(day=1)
-
-        self.budget_id = "budget_shopping"
-        add_subscription(self.conn, {
-            "id": self.budget_id, "name": "Shopping Budget", "category": "Others",
+        cls.today = date(2025, 10, 15)
+        cls.current_month = date(2025, 10, 1)
+        cls.next_month = date(2025, 11, 1)
+        cls.month_after_next = date(2025, 12, 1)
+        cls.budget_id = "budget_shopping"
+        cls._template = create_test_db()
+
+        add_subscription(cls._template, {
+            "id": cls.budget_id, "name": "Shopping Budget", "category": "Others",
             "monthly_amount": 200.00, "payment_account_id": "Visa Produbanco",
-            "start_date": self.current_month, "is_budget": True
+            "start_date": cls.current_month, "is_budget": True
         })
 
-        with patch('cashflow.controller.date') as mock_date:
-            mock_date.today.return_value = self.today
-            generate_forecasts(self.conn, 6)
+        generate_forecasts(cls._template, 6, from_date=cls.today)
         
-        commit_past_and_current_forecasts(self.conn, self.current_month)
+        commit_past_and_current_forecasts(cls._template, cls.current_month)
 
-        print("\n--- Test: Future-Dated Budget Update ---")
-        print(f"SETUP: Today is {self.today}. Visa cut-off is day 14.")
-        
         # This expense is created on Oct 15, but its date_payed will be in November
         expense_request = {
             "type": "simple", "description": "Late Month Purchase", "amount": 50.00,
-            "account": "Visa Produbanco", "budget": self.budget_id
+            "account": "Visa Produbanco", "budget": cls.budget_id
         }
-        with patch('cashflow.controller.date') as mock_date:
-            mock_date.today.return_value = self.today
-            process_transaction_request(self.conn, expense_request)
-        
-        print("SETUP: Logged a $50.00 expense. Because it's after the cut-off, its 'date_payed' is in November.")
+        process_transaction_request(cls._template, expense_request, transaction_date=cls.today)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._template.close()
 
+    def setUp(self):
+        self.conn = clone_connection(self._template)
 
     def tearDown(self):
         self.conn.close()
@@ -204,36 +198,23 @@ class TestFutureDatedBudgetUpdate(unittest.TestCase):
         # Pre-condition check: Current month is untouched, next month is affected
         allocation_current = get_budget_allocation_for_month(self.conn, self.budget_id, self.current_month)
         allocation_next = get_budget_allocation_for_month(self.conn, self.budget_id, self.next_month)
-        
-        print("\nSTEP 1: Pre-Condition Verification")
-        print(f"  - October Budget ('current'): {allocation_current['amount']:.2f}. Expected: -200.00 (Correct, expense was for Nov).")
-        print(f"  - November Budget ('next'): {allocation_next['amount']:.2f}. Expected: -150.00 (Correct, -200 + 50 expense).")
-        
+
         self.assertAlmostEqual(allocation_current['amount'], -200.00)
         self.assertAlmostEqual(allocation_next['amount'], -150.00)
 
         # Action: Update the budget to 300
-        print("\nSTEP 2: Action")
-        print(f"  - Calling process_budget_update with new amount: 300.00")
-        with patch('cashflow.controller.date') as mock_date:
-            mock_date.today.return_value = self.today
-            process_budget_update(self.conn, self.budget_id, {"monthly_amount": 300.00})
+        process_budget_update(self.conn, self.budget_id, {"monthly_amount": 300.00}, update_date=self.today)
 
         # Assertion 1: Current month's allocation is recalculated (no spending in Oct)
         allocation_current_after = get_budget_allocation_for_month(self.conn, self.budget_id, self.current_month)
-        print("\nSTEP 3: Post-Condition Verification")
-        print(f"  - October Budget: {allocation_current_after['amount']:.2f}. Expected: -300.00 (Correct, recalculated with new amount).")
         self.assertAlmostEqual(allocation_current_after['amount'], -300.00)
 
         # Assertion 2: Next month's allocation is correctly recalculated
         # New balance should be -300 + 50 = -250
         allocation_next_after = get_budget_allocation_for_month(self.conn, self.budget_id, self.next_month)
-        print(f"  - November Budget: {allocation_next_after['amount']:.2f}. Expected: -250.00 (Correct, new base of -300 + 50 expense).")
         self.assertAlmostEqual(allocation_next_after['amount'], -250.00)
 
         # Assertion 3: The forecast for the month after next is updated
         allocation_future = get_budget_allocation_for_month(self.conn, self.budget_id, self.month_after_next)
-        print(f"  - December Budget: {allocation_future['amount']:.2f}. Expected: -300.00 (Correct, future forecasts regenerated).")
         self.assertAlmostEqual(allocation_future['amount'], -300.00)
-        print("\n--- Test Complete ---")
 
@@ -6,9 +6,18 @@ from dateutil.relativedelta import relativedelta
 
 from cashflow.controller import process_transaction_request, run_monthly_budget_reconciliation, run_monthly_rollover
 from cashflow.database import create_test_db
-from cashflow.repository import add_subscription, get_all_transactions, add_transactions, get_budget_allocation_for_month
+from cashflow.repository import (
+    add_subscription, get_all_transactions, add_transactions, get_budget_allocation_for_month,
+    update_subscription
+)
 
 class TestBudgetLogic(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Pin the month under test to a fixed date so results never depend on today."""
+        cls.current_month_start = date(2025, 10, 1)
+        cls.expense_date = date(2025, 10, 15)
+
     def setUp(self):
         """Set up an in-memory database for each test."""
         self.conn = create_test_db()
@@ -23,7 +32,6 @@ class TestBudgetLogic(unittest.TestCase):
         add_subscription(self.conn, self.food_budget_sub)
 
         # 2. Create the initial budget allocation transaction for the current month
-        self.current_month_start = date.today().replace(day=1)
         self.initial_allocation = {
             "date_created": self.current_month_start,
             "date_payed": self.current_month_start,
@@ -47,7 +55,7 @@ class TestBudgetLogic(unittest.TestCase):
             "type": "simple", "description": "Groceries", "amount": 50.00,
             "account": "Cash", "category": "Home Groceries", "budget": "budget_food"
         }
-        process_transaction_request(self.conn, expense_request)
+        process_transaction_request(self.conn, expense_request, transaction_date=self.expense_date)
 
         # Verify the budget allocation was updated
         allocation = get_budget_allocation_for_month(self.conn, "budget_food", self.current_month_start)
@@ -63,7 +71,7 @@ class TestBudgetLogic(unittest.TestCase):
             "type": "simple", "description": "Fancy Dinner", "amount": 400.00,
             "account": "Cash", "category": "Dining-Snacks", "budget": "budget_food"
         }
-        process_transaction_request(self.conn, over_expense_request)
+        process_transaction_request(self.conn, over_expense_request, transaction_date=self.expense_date)
 
         # Verify the budget allocation is now 0
         allocation = get_budget_allocation_for_month(self.conn, "budget_food", self.current_month_start)
@@ -80,17 +88,17 @@ class TestBudgetLogic(unittest.TestCase):
             "type": "simple", "description": "Groceries", "amount": 100.00,
             "account": "Cash", "category": "Home Groceries", "budget": "budget_food"
         }
-        process_transaction_request(self.conn, expense)
+        process_transaction_request(self.conn, expense, transaction_date=self.expense_date)
 
         # Run month-end reconciliation
         run_monthly_budget_reconciliation(self.conn, self.current_month_start)
 
         # Verify results
-        transactions = get_all_transactions(self.conn)
-        original_allocation = next(t for t in transactions if t["description"] == "Food Budget")
-        release_transaction = next(t for t in transactions if "Budget Release" in t["description"])
+        rows = self.conn.execute("SELECT description, amount, status, category FROM transactions").fetchall()
+        original_allocation = next(row for row in rows if row["description"] == "Food Budget")
+        release_transaction = next(row for row in rows if row["category"] == "Budget Release")
 
-        self.assertEqual(len(transactions), 3) # Initial Allocation + Expense + Release
+        self.assertEqual(len(rows), 3) # Initial Allocation + Expense + Release
         self.assertAlmostEqual(original_allocation["amount"], 0)
         self.assertAlmostEqual(release_transaction["amount"], 200.00) # Positive inflow
         self.assertEqual(release_transaction["status"], "committed")
@@ -102,15 +110,14 @@ class TestBudgetLogic(unittest.TestCase):
         original allocation should remain untouched.
         """
         # Update subscription to 'keep'
-        self.conn.execute("UPDATE subscriptions SET underspend_behavior = 'keep' WHERE id = 'budget_food'")
-        self.conn.commit()
+        update_subscription(self.conn, "budget_food", {"underspend_behavior": "keep"})
 
         # Log a $100 expense, leaving $200
         expense = {
             "type": "simple", "description": "Groceries", "amount": 100.00,
             "account": "Cash", "category": "Home Groceries", "budget": "budget_food"
         }
-        process_transaction_request(self.conn, expense)
+        process_transaction_request(self.conn, expense, transaction_date=self.expense_date)
 
         # Run month-end reconciliation
         run_monthly_budget_reconciliation(self.conn, self.current_month_start)
@@ -2,84 +2,96 @@ import unittest
 from datetime import date
 from unittest.mock import patch
 
-from cashflow.database import create_test_db
+from cashflow.database import create_test_db, transaction
 from cashflow.repository import (
-    add_transactions, get_all_transactions, get_transaction_by_id,
+    add_transactions, get_transaction_by_description,
     add_subscription, get_budget_allocation_for_month
 )
 from cashflow.controller import process_transaction_update, process_transaction_deletion, process_transaction_request
-
-class TestTransactionEditingAndDeletion(unittest.TestCase):
-    def setUp(self):
-        """Set up an in-memory database and seed it with initial data for each test."""
-        self.conn = create_test_db()
-        self.today = date(2025, 10, 10)
-
-        # --- Setup a consistent scenario for testing ---
-        # 1. Create a budget subscription
-        add_subscription(self.conn, {
-            "id": "budget_food", "name": "Food Budget", "category": "Food",
-            "monthly_amount": 400.00, "payment_account_id": "Cash",
-            "start_date": self.today.replace(day=1), "is_budget": True
-        })
-
-        # 2. Create a budget allocation for "Food"
-        self.food_budget_allocation = {
-            "date_created": self.today.replace(day=1),
-            "date_payed": self.today.replace(day=1),
-            "description": "Food Budget", "account": "Cash", "amount": -400.00,
-            "category": "Food", "budget": "budget_food", "status": "committed",
-            "origin_id": "budget_food",
-        }
-        add_transactions(self.conn, [self.food_budget_allocation])
-
-        # 3. Create a simple transaction to be edited/deleted
-        self.initial_expense = {
-            "type": "simple", "description": "Weekly Groceries", "amount": 50.00,
-            "account": "Cash", "budget": "budget_food"
-        }
-        with patch('cashflow.controller.date') as mock_date:
-            mock_date.today.return_value = self.today
-            process_transaction_request(self.conn, self.initial_expense)
-
-    def tearDown(self):
-        """Close the database connection after each test."""
-        self.conn.close()
+from db_test_case import RollbackTestCase
+
+class TestTransactionEditingAndDeletion(RollbackTestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Set up an in-memory database shared by the class and seed it once."""
+        cls.conn = create_test_db()
+        cls.today = date(2025, 10, 10)
+        cls.month_start = cls.today.replace(day=1)
+
+        # Freeze the controller's clock for the whole class, setup included
+        date_patcher = patch('cashflow.controller.date')
+        cls.mock_date = date_patcher.start()
+        cls.mock_date.today.return_value = cls.today
+        cls.addClassCleanup(date_patcher.stop)
+
+        with transaction(cls.conn):
+            # --- Setup a consistent scenario for testing ---
+            # 1. Create a budget subscription
+            add_subscription(cls.conn, {
+                "id": "budget_food", "name": "Food Budget", "category": "Food",
+                "monthly_amount": 400.00, "payment_account_id": "Cash",
+                "start_date": cls.month_start, "is_budget": True
+            })
+
+            # 2. Seed the Food allocation together with the expense to be
+            #    edited/deleted. The allocation is stored with the live balance
+            #    the expense leaves behind (-400 + 50), exactly what
+            #    process_transaction_request would have written.
+            cls.food_budget_allocation = {
+                "date_created": cls.month_start,
+                "date_payed": cls.month_start,
+                "description": "Food Budget", "account": "Cash", "amount": -350.00,
+                "category": "Food", "budget": "budget_food", "status": "committed",
+                "origin_id": "budget_food",
+            }
+            cls.initial_expense = {
+                "date_created": cls.today, "date_payed": cls.today,
+                "description": "Weekly Groceries", "account": "Cash", "amount": -50.00,
+                "category": None, "budget": "budget_food", "status": "committed",
+                "origin_id": None,
+            }
+            add_transactions(cls.conn, [cls.food_budget_allocation, cls.initial_expense])
+
+    @classmethod
+    def tearDownClass(cls):
+        """Close the shared database connection."""
+        cls.conn.close()
+
+    def _food_budget_amount(self):
+        """Current amount of the Food budget allocation for the test month."""
+        return get_budget_allocation_for_month(self.conn, "budget_food", self.today)["amount"]
 
     def test_update_transaction_amount_increase_and_adjusts_budget(self):
         """
         Tests that increasing an expense's amount correctly adjusts the linked budget's live balance.
         """
-        expense_to_update = next(t for t in get_all_transactions(self.conn) if t['description'] == 'Weekly Groceries')
+        expense_to_update = get_transaction_by_description(self.conn, 'Weekly Groceries')
         
         updates = {"amount": -75.00}
         process_transaction_update(self.conn, expense_to_update['id'], updates)
 
-        budget_after = get_budget_allocation_for_month(self.conn, "budget_food", self.today)
-        self.assertAlmostEqual(budget_after["amount"], -325.00)
+        self.assertAlmostEqual(self._food_budget_amount(), -325.00)
 
     def test_update_transaction_amount_decrease_and_adjusts_budget(self):
         """
         Tests that decreasing an expense's amount correctly adjusts the linked budget's live balance.
         """
-        expense_to_update = next(t for t in get_all_transactions(self.conn) if t['description'] == 'Weekly Groceries')
+        expense_to_update = get_transaction_by_description(self.conn, 'Weekly Groceries')
         
         updates = {"amount": -25.00}
         process_transaction_update(self.conn, expense_to_update['id'], updates)
 
-        budget_after = get_budget_allocation_for_month(self.conn, "budget_food", self.today)
-        self.assertAlmostEqual(budget_after["amount"], -375.00)
+        self.assertAlmostEqual(self._food_budget_amount(), -375.00)
 
     def test_delete_transaction_and_reverses_budget_impact(self):
         """
         Tests that deleting an expense correctly "returns" the amount to the linked budget.
         """
-        expense_to_delete = next(t for t in get_all_transactions(self.conn) if t['description'] == 'Weekly Groceries')
+        expense_to_delete = get_transaction_by_description(self.conn, 'Weekly Groceries')
         
         process_transaction_deletion(self.conn, expense_to_delete['id'])
 
-        budget_after = get_budget_allocation_for_month(self.conn, "budget_food", self.today)
-        self.assertAlmostEqual(budget_after["amount"], -400.00)
+        self.assertAlmostEqual(self._food_budget_amount(), -400.00)
 
     def test_add_budget_to_existing_transaction(self):
         """
@@ -90,66 +102,69 @@ class TestTransactionEditingAndDeletion(unittest.TestCase):
             "type": "simple", "description": "Snacks", "amount": 20.00,
             "account": "Cash", "budget": None
         }
-        with patch('cashflow.controller.date') as mock_date:
-            mock_date.today.return_value = self.today
-            process_transaction_request(self.conn, no_budget_expense)
+        process_transaction_request(self.conn, no_budget_expense)
 
         # Verify budget is initially untouched
-        budget_before = get_budget_allocation_for_month(self.conn, "budget_food", self.today)
-        self.assertAlmostEqual(budget_before["amount"], -350.00)
+        self.assertAlmostEqual(self._food_budget_amount(), -350.00)
 
         # 2. Update the transaction to add the budget link
-        expense_to_update = next(t for t in get_all_transactions(self.conn) if t['description'] == 'Snacks')
+        expense_to_update = get_transaction_by_description(self.conn, 'Snacks')
         process_transaction_update(self.conn, expense_to_update['id'], {"budget": "budget_food"})
 
         # 3. Verify the budget was reduced
-        budget_after = get_budget_allocation_for_month(self.conn, "budget_food", self.today)
         # Should be -350 (from initial expense) - 20 (from new expense) = -330, but recalculation is total
         # Total spent is now 50 + 20 = 70. New balance is -400 + 70 = -330
-        self.assertAlmostEqual(budget_after["amount"], -330.00)
+        self.assertAlmostEqual(self._food_budget_amount(), -330.00)
 
     def test_remove_budget_from_existing_transaction(self):
         """
         Tests that removing a budget link from a transaction correctly "returns" the money.
         """
         # Initial state: budget is -350 from the -50 expense
-        expense_to_update = next(t for t in get_all_transactions(self.conn) if t['description'] == 'Weekly Groceries')
+        expense_to_update = get_transaction_by_description(self.conn, 'Weekly Groceries')
 
         # Update the transaction to remove the budget link
         process_transaction_update(self.conn, expense_to_update['id'], {"budget": None})
 
         # Verify the budget was restored
-        budget_after = get_budget_allocation_for_month(self.conn, "budget_food", self.today)
         # After removing the expense, there is no spending, so budget should be -400
-        self.assertAlmostEqual(budget_after["amount"], -400.00)
+        self.assertAlmostEqual(self._food_budget_amount(), -400.00)
+
 
+class TestOverspendingScenarios(RollbackTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.conn = create_test_db()
+        cls.today = date(2025, 10, 10)
+        cls.month_start = cls.today.replace(day=1)
 
-class TestOverspendingScenarios(unittest.TestCase):
-    def setUp(self):
-        self.conn = create_test_db()
-        self.today = date(2025, 10, 10)
+        # Freeze the controller's clock for the whole class, setup included
+        date_patcher = patch('cashflow.controller.date')
+        cls.mock_date = date_patcher.start()
+        cls.mock_date.today.return_value = cls.today
+        cls.addClassCleanup(date_patcher.stop)
 
         # Setup a -100 budget
-        add_subscription(self.conn, {
-            "id": "budget_transport", "name": "Transport Budget", "category": "Transport",
-            "monthly_amount": 100, "payment_account_id": "Cash",
-            "start_date": self.today.replace(day=1), "is_budget": True
-        })
-        
-        add_transactions(self.conn, [{
-            "date_created": self.today.replace(day=1), "date_payed": self.today.replace(day=1),
-            "description": "Transport Budget", "account": "Cash", "amount": -100,
-            "category": "Transport", "budget": "budget_transport", "status": "committed", "origin_id": "budget_transport"
-        }])
-
-        # Log expenses to be overspent (-120 total)
-        with patch('cashflow.controller.date') as mock_date:
-            mock_date.today.return_value = self.today
-            process_transaction_request(self.conn, {"type": "simple", "description": "Gas", "amount": 90, "account": "Cash", "budget": "budget_transport"})
-            process_transaction_request(self.conn, {"type": "simple", "description": "Tires", "amount": 30, "account": "Cash", "budget": "budget_transport"})
-        
-    def tearDown(self):
-        self.conn.close()
+        with transaction(cls.conn):
+            add_subscription(cls.conn, {
+                "id": "budget_transport", "name": "Transport Budget", "category": "Transport",
+                "monthly_amount": 100, "payment_account_id": "Cash",
+                "start_date": cls.month_start, "is_budget": True
+            })
+
+            add_transactions(cls.conn, [{
+                "date_created": cls.month_start, "date_payed": cls.month_start,
+                "description": "Transport Budget", "account": "Cash", "amount": -100,
+                "category": "Transport", "budget": "budget_transport", "status": "committed", "origin_id": "budget_transport"
+            }])
+
+            # Log expenses to be overspent (-120 total)
+            process_transaction_request(cls.conn, {"type": "simple", "description": "Gas", "amount": 90, "account": "Cash", "budget": "budget_transport"})
+            process_transaction_request(cls.conn, {"type": "simple", "description": "Tires", "amount": 30, "account": "Cash", "budget": "budget_transport"})
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.conn.close()
 
     def test_setup_correctly_caps_budget_at_zero(self):
         """Verify that the initial state is correct: budget is overspent and capped at 0."""
@@ -158,7 +173,7 @@ class TestOverspendingScenarios(unittest.TestCase):
 
     def test_update_expense_while_still_overspent(self):
         """Tests updating an expense when the budget remains overspent (e.g., -120 -> -130)."""
-        expense_to_update = next(t for t in get_all_transactions(self.conn) if t['description'] == 'Tires') # is -30
+        expense_to_update = get_transaction_by_description(self.conn, 'Tires') # is -30
         
         process_transaction_update(self.conn, expense_to_update['id'], {"amount": -40})
         
@@ -167,7 +182,7 @@ class TestOverspendingScenarios(unittest.TestCase):
 
     def test_update_expense_from_over_to_underspent(self):
         """Tests updating an expense that brings the budget from overspent to underspent (e.g., -120 -> -90)."""
-        expense_to_update = next(t for t in get_all_transactions(self.conn) if t['description'] == 'Tires') # is -30
+        expense_to_update = get_transaction_by_description(self.conn, 'Tires') # is -30
         
         process_transaction_update(self.conn, expense_to_update['id'], {"amount": -10}) # Total spend is now 90+10=100
         
@@ -184,7 +199,7 @@ class TestOverspendingScenarios(unittest.TestCase):
     def test_update_expense_from_under_to_overspent(self):
         """Tests updating an expense that brings the budget from underspent to overspent."""
         # First, reduce an expense to make it underspent
-        expense_to_update = next(t for t in get_all_transactions(self.conn) if t['description'] == 'Tires') # is -30
+        expense_to_update = get_transaction_by_description(self.conn, 'Tires') # is -30
         process_transaction_update(self.conn, expense_to_update['id'], {"amount": -5}) # Total spend is 95
         
         budget_before = get_budget_allocation_for_month(self.conn, "budget_transport", self.today)
@@ -198,7 +213,7 @@ class TestOverspendingScenarios(unittest.TestCase):
 
     def test_delete_expense_while_still_overspent(self):
         """Tests deleting an expense when the budget remains overspent (e.g., -120 -> -90)."""
-        expense_to_delete = next(t for t in get_all_transactions(self.conn) if t['description'] == 'Tires') # -30
+        expense_to_delete = get_transaction_by_description(self.conn, 'Tires') # -30
         
         process_transaction_deletion(self.conn, expense_to_delete['id'])
         
@@ -208,7 +223,7 @@ class TestOverspendingScenarios(unittest.TestCase):
 
     def test_delete_expense_that_brings_budget_underspent(self):
         """Tests deleting an expense that makes the budget go from overspent to underspent (e.g., -120 -> -30)."""
-        expense_to_delete = next(t for t in get_all_transactions(self.conn) if t['description'] == 'Gas') # -90
+        expense_to_delete = get_transaction_by_description(self.conn, 'Gas') # -90
         
         process_transaction_deletion(self.conn, expense_to_delete['id'])
         
@@ -1,10 +1,11 @@
 import unittest
 import os
 import csv
+import tempfile
 from datetime import date
 from unittest.mock import patch
 
-from cashflow.database import create_test_db
+from cashflow.database import create_test_db, transaction
 from ui.cli_display import export_transactions_to_csv
 from cashflow.controller import process_transaction_request, run_monthly_rollover
 from cashflow.repository import add_subscription
@@ -13,40 +14,41 @@ class TestExport(unittest.TestCase):
     def setUp(self):
         self.conn = create_test_db()
         self.today = date(2025, 10, 15)
-        self.test_csv_path = "test_transactions.csv"
+        self.month_start = self.today.replace(day=1)
+        # Export into a private temp dir rather than the working directory
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.test_csv_path = os.path.join(tmp_dir.name, "test_transactions.csv")
 
     def tearDown(self):
         self.conn.close()
-        if os.path.exists(self.test_csv_path):
-            os.remove(self.test_csv_path)
 
     def test_export_transactions_to_csv_with_balance(self):
         """
         Tests that transactions are correctly exported to a CSV file
         with all columns, including the running balance.
         """
-        print("\n--- Test: Export Transactions with Balance ---")
-        
         # --- Setup ---
-        add_subscription(self.conn, {
-            "id": "budget_food", "name": "Food Budget", "category": "Food",
-            "monthly_amount": 400, "payment_account_id": "Cash",
-            "start_date": self.today.replace(day=1), "is_budget": True
-        })
-        
-        with patch('cashflow.controller.date') as mock_date:
-            mock_date.today.return_value = self.today
-            run_monthly_rollover(self.conn, self.today)
+        with transaction(self.conn):
+            add_subscription(self.conn, {
+                "id": "budget_food", "name": "Food Budget", "category": "Food",
+                "monthly_amount": 400, "payment_account_id": "Cash",
+                "start_date": self.month_start, "is_budget": True
+            })
+
+            with patch('cashflow.controller.date') as mock_date:
+                mock_date.today.return_value = self.today
+                run_monthly_rollover(self.conn, self.today)
 
-        process_transaction_request(self.conn, {
-            "type": "simple", "description": "Movie ticket", "amount": 20,
-            "account": "Cash", "category": "Personal"
-        }, transaction_date=date(2025, 10, 10))
+            process_transaction_request(self.conn, {
+                "type": "simple", "description": "Movie ticket", "amount": 20,
+                "account": "Cash", "category": "Personal"
+            }, transaction_date=date(2025, 10, 10))
 
-        process_transaction_request(self.conn, {
-            "type": "simple", "description": "Groceries", "amount": 80,
-            "account": "Cash", "budget": "budget_food"
-        }, transaction_date=date(2025, 10, 12))
+            process_transaction_request(self.conn, {
+                "type": "simple", "description": "Groceries", "amount": 80,
+                "account": "Cash", "budget": "budget_food"
+            }, transaction_date=date(2025, 10, 12))
 
         # --- Action ---
         export_transactions_to_csv(self.conn, self.test_csv_path, include_balance=True)
@@ -57,11 +59,6 @@ class TestExport(unittest.TestCase):
         with open(self.test_csv_path, 'r') as f:
             reader = csv.reader(f)
             lines = list(reader)
-        
-        print("\n--- CSV Content ---")
-        for i, line in enumerate(lines):
-            print(f"Line {i}: {line}")
-        print("-------------------")
 
         # Header + 7 forecasts + 2 committed transactions = 10 lines
         self.assertEqual(len(lines), 10)
@@ -75,8 +72,6 @@ class TestExport(unittest.TestCase):
         self.assertEqual(lines[1][3], "Food Budget")
         self.assertEqual(lines[1][5], "-320.0")
         self.assertEqual(lines[1][10], "-320.0")
-        
-        print("\n--- Test Complete ---")
 
 if __name__ == "__main__":
     unittest.main()
@@ -6,6 +6,9 @@ from cashflow.database import create_test_db
 from cashflow.controller import process_transaction_request
 from cashflow.repository import get_all_transactions
 
+# Month offsets used by the payment-date assertions, built once
+_MONTH_DELTAS = tuple(relativedelta(months=i) for i in range(5))
+
 class TestGracePeriod(unittest.TestCase):
     def setUp(self):
         """Set up an in-memory database for testing."""
@@ -37,7 +40,7 @@ class TestGracePeriod(unittest.TestCase):
         self.assertEqual(len(transactions), 1, msg="Should create exactly one transaction")
         
         created_transaction = transactions[0]
-        effective_date = self.today + relativedelta(months=2)
+        effective_date = self.today + _MONTH_DELTAS[2]
         
         # The payment date for a credit card is on a specific day, so we just check year and month
         self.assertEqual(created_transaction['date_payed'].year, effective_date.year, 
@@ -70,7 +73,7 @@ class TestGracePeriod(unittest.TestCase):
         
         # Check payment dates for each installment
         for i in range(3):
-            effective_date = self.today + relativedelta(months=2 + i)
+            effective_date = self.today + _MONTH_DELTAS[2 + i]
             self.assertEqual(transactions[i]['date_payed'].year, effective_date.year,
                              msg=f"Payment year for installment {i+1} should be correctly offset")
             self.assertEqual(transactions[i]['date_payed'].month, effective_date.month,
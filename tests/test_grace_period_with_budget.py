@@ -1,30 +1,40 @@
 import unittest
 from datetime import date
-from unittest.mock import patch
 from dateutil.relativedelta import relativedelta
 
-from cashflow.database import create_test_db
+from cashflow.database import create_test_db, clone_connection, transaction
 from cashflow.controller import process_transaction_request, run_monthly_rollover
-from cashflow.repository import add_subscription, get_budget_allocation_for_month, get_setting, get_all_transactions
+from cashflow.repository import add_subscription, get_budget_allocations_for_months, get_setting, get_all_transactions
+
+# Month offsets used by the budget assertions, built once
+_MONTH_DELTAS = tuple(relativedelta(months=i) for i in range(4))
 
 class TestGracePeriodWithBudget(unittest.TestCase):
-    def setUp(self):
-        """Set up an in-memory database for testing."""
-        self.conn = create_test_db()
-        self.today = date(2025, 10, 5)
-        self.budget_id = "budget_shopping"
+    @classmethod
+    def setUpClass(cls):
+        """Build the budget and its forecasts once for the whole class."""
+        cls._template = create_test_db()
+        cls.today = date(2025, 10, 5)
+        cls.month_start = cls.today.replace(day=1)
+        cls.budget_id = "budget_shopping"
 
-        # Create a Shopping budget
-        add_subscription(self.conn, {
-            "id": self.budget_id, "name": "Shopping Budget", "category": "Shopping",
-            "monthly_amount": 300.00, "payment_account_id": "Visa Produbanco",
-            "start_date": self.today.replace(day=1), "is_budget": True
-        })
+        # Create a Shopping budget and generate forecasts for the next few
+        # months, committed as one transaction
+        with transaction(cls._template):
+            add_subscription(cls._template, {
+                "id": cls.budget_id, "name": "Shopping Budget", "category": "Shopping",
+                "monthly_amount": 300.00, "payment_account_id": "Visa Produbanco",
+                "start_date": cls.month_start, "is_budget": True
+            })
+            run_monthly_rollover(cls._template, cls.today)
 
-        # Generate forecasts for the next few months
-        with patch('cashflow.controller.date') as mock_date:
-            mock_date.today.return_value = self.today
-            run_monthly_rollover(self.conn, self.today)
+    @classmethod
+    def tearDownClass(cls):
+        cls._template.close()
+
+    def setUp(self):
+        """Give each test its own copy of the prepared database."""
+        self.conn = clone_connection(self._template)
 
     def tearDown(self):
         """Close the database connection."""
@@ -48,8 +58,9 @@ class TestGracePeriodWithBudget(unittest.TestCase):
         process_transaction_request(self.conn, request, transaction_date=self.today)
         
         # Verification
-        oct_budget = get_budget_allocation_for_month(self.conn, self.budget_id, self.today)
-        dec_budget = get_budget_allocation_for_month(self.conn, self.budget_id, self.today + relativedelta(months=2))
+        october, december = self.month_start, (self.today + _MONTH_DELTAS[2]).replace(day=1)
+        budgets = get_budget_allocations_for_months(self.conn, self.budget_id, [october, december])
+        oct_budget, dec_budget = budgets[october], budgets[december]
 
         self.assertAlmostEqual(oct_budget['amount'], -300.00, 
                                msg="October budget should be unaffected")
@@ -75,10 +86,9 @@ class TestGracePeriodWithBudget(unittest.TestCase):
         process_transaction_request(self.conn, request, transaction_date=self.today)
         
         # Verification
-        oct_budget = get_budget_allocation_for_month(self.conn, self.budget_id, self.today)
-        nov_budget = get_budget_allocation_for_month(self.conn, self.budget_id, self.today + relativedelta(months=1))
-        dec_budget = get_budget_allocation_for_month(self.conn, self.budget_id, self.today + relativedelta(months=2))
-        jan_budget = get_budget_allocation_for_month(self.conn, self.budget_id, self.today + relativedelta(months=3))
+        months = [(self.today + delta).replace(day=1) for delta in _MONTH_DELTAS]
+        budgets = get_budget_allocations_for_months(self.conn, self.budget_id, months)
+        oct_budget, nov_budget, dec_budget, jan_budget = (budgets[month] for month in months)
 
         self.assertAlmostEqual(oct_budget['amount'], -300.00,
                                msg="October budget should be unaffected")
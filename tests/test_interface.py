@@ -8,9 +8,13 @@ from cashflow.repository import add_subscription
 from datetime import date
 
 class TestInterface(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.today = date(2025, 10, 15)
+        cls.month_start = cls.today.replace(day=1)
+
     def setUp(self):
         self.conn = create_test_db()
-        self.today = date(2025, 10, 15)
 
     def tearDown(self):
         self.conn.close()
@@ -28,7 +32,7 @@ class TestInterface(unittest.TestCase):
         add_subscription(self.conn, {
             "id": "budget_food", "name": "Food Budget", "category": "Food",
             "monthly_amount": 400, "payment_account_id": "Cash",
-            "start_date": self.today.replace(day=1), "is_budget": True
+            "start_date": self.month_start, "is_budget": True
         })
         
         with patch('cashflow.controller.date') as mock_date:
@@ -1,21 +1,24 @@
 
+import sqlite3
 import unittest
+from datetime import date
 from unittest.mock import patch, MagicMock
+from dateutil.relativedelta import relativedelta
 
-from cashflow.controller import process_transaction_request
+from cashflow.controller import (
+    process_transaction_request, generate_forecasts,
+    run_monthly_rollover, run_monthly_rollover_range
+)
+from cashflow.repository import get_all_transactions, add_subscription
 
 # Placeholder for database setup logic
-from cashflow.database import create_test_db
+from cashflow.database import create_test_db, clone_connection, transaction
 
 
 class TestMainController(unittest.TestCase):
     def setUp(self):
-        """Set up an in-memory database for each test."""
-        self.conn = create_test_db()
-
-    def tearDown(self):
-        """Close the database connection after each test."""
-        self.conn.close()
+        """Repository and transactions are mocked, so a stand-in connection is enough."""
+        self.conn = MagicMock(spec=sqlite3.Connection)
 
     @patch("cashflow.controller.repository")
     @patch("cashflow.controller.transactions")
@@ -137,11 +140,6 @@ class TestMonthlyRollover(unittest.TestCase):
         An integration test for the entire monthly rollover process that
         simulates moving into a new month.
         """
-        from cashflow.controller import generate_forecasts, run_monthly_rollover
-        from cashflow.repository import get_all_transactions, add_subscription
-        from datetime import date
-        from dateutil.relativedelta import relativedelta
-
         print("\n\n--- Running Test: test_run_monthly_rollover_integration ---")
 
         # --- Setup: Simulate a fixed point in time ---
@@ -149,60 +147,88 @@ class TestMonthlyRollover(unittest.TestCase):
         NEXT_MONTH = TEST_TODAY + relativedelta(months=1)
         print(f"--- Test: Simulated 'today' is {TEST_TODAY}. We will roll over to {NEXT_MONTH.strftime('%Y-%m')}. ---")
 
-        # 1. Set a 3-month forecast horizon
-        self.conn.execute(
-            "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
-            ("forecast_horizon_months", "3")
-        )
-        self.conn.commit()
-        print("--- Test: Set forecast horizon to 3 months. ---")
-
-        # 2. Add a budget that started last month
-        food_budget = {
-            "id": "budget_food", "name": "Food", "category": "Food",
-            "monthly_amount": 400, "payment_account_id": "Cash",
-            "start_date": (TEST_TODAY - relativedelta(months=1)).replace(day=1),
-            "is_budget": True
-        }
-        add_subscription(self.conn, food_budget)
-        print(f"--- Test: Added 'Food' budget starting on {food_budget['start_date']}. ---")
-
-        # 3. Generate initial forecasts from our simulated "today"
-        print("\n--- Test Action: Generating initial forecasts (for Oct, Nov, Dec)... ---")
-        generate_forecasts(self.conn, horizon_months=3, from_date=TEST_TODAY)
-        
-        # --- Action: Simulate running the process chronologically ---
-        print(f"\n--- Test Action: Running rollover for {TEST_TODAY.strftime('%Y-%m')}... ---")
-        run_monthly_rollover(self.conn, TEST_TODAY)
-        
-        print(f"\n--- Test Action: Running rollover for {NEXT_MONTH.strftime('%Y-%m')}... ---")
-        run_monthly_rollover(self.conn, NEXT_MONTH)
+        # Setup and both rollovers are written as one transaction; the
+        # commits issued along the way are deferred to the end of the block.
+        with transaction(self.conn):
+            # 1. Set a 3-month forecast horizon
+            self.conn.execute(
+                "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                ("forecast_horizon_months", "3")
+            )
+            print("--- Test: Set forecast horizon to 3 months. ---")
+
+            # 2. Add a budget that started last month
+            food_budget = {
+                "id": "budget_food", "name": "Food", "category": "Food",
+                "monthly_amount": 400, "payment_account_id": "Cash",
+                "start_date": (TEST_TODAY - relativedelta(months=1)).replace(day=1),
+                "is_budget": True
+            }
+            add_subscription(self.conn, food_budget)
+            print(f"--- Test: Added 'Food' budget starting on {food_budget['start_date']}. ---")
+
+            # 3. Generate initial forecasts from our simulated "today"
+            print("\n--- Test Action: Generating initial forecasts (for Oct, Nov, Dec)... ---")
+            generate_forecasts(self.conn, horizon_months=3, from_date=TEST_TODAY)
+
+            # --- Action: Simulate running the process chronologically ---
+            print(f"\n--- Test Action: Running rollovers for {TEST_TODAY.strftime('%Y-%m')} through {NEXT_MONTH.strftime('%Y-%m')}... ---")
+            run_monthly_rollover_range(self.conn, TEST_TODAY, NEXT_MONTH)
 
         # --- Assertions ---
         print("\n--- Test Assertions: Verifying the results... ---")
         transactions = get_all_transactions(self.conn)
-        
+
+        # Index the rows once; every check below reads from these
+        first_by_origin_month = {}
+        forecast_dates = []
+        for t in transactions:
+            first_by_origin_month.setdefault((t['origin_id'], t['date_created'].month), t)
+            if t['status'] == 'forecast':
+                forecast_dates.append(t['date_created'])
+
         # a) Check that NEXT month's budget (November) is now committed
-        next_month_budget = next(
-            t for t in transactions 
-            if t['origin_id'] == 'budget_food' 
-            and t['date_created'].month == NEXT_MONTH.month
-        )
+        next_month_budget = first_by_origin_month[('budget_food', NEXT_MONTH.month)]
         self.assertEqual(next_month_budget['status'], 'committed')
         print(f"--- Test OK: Budget for {NEXT_MONTH.strftime('%Y-%m')} is now 'committed'. ---")
 
         # b) Check that the forecast horizon is still maintained
-        new_forecast_count = sum(1 for t in transactions if t['status'] == 'forecast')
+        new_forecast_count = len(forecast_dates)
         self.assertEqual(new_forecast_count, 3)
         print(f"--- Test OK: Found {new_forecast_count} future forecasts, maintaining the 3-month horizon. ---")
 
         # c) Verify the new latest forecast is for the correct future month
-        latest_forecast = max(t['date_created'] for t in transactions if t['status'] == 'forecast')
+        latest_forecast = max(forecast_dates)
         expected_latest_month = (NEXT_MONTH + relativedelta(months=3))
         self.assertEqual(latest_forecast.month, expected_latest_month.month)
         print(f"--- Test OK: The latest forecast is correctly set for {latest_forecast.strftime('%Y-%m')}. ---")
         print("--- Test Finished Successfully ---\n")
 
+    def test_run_monthly_rollover_range_matches_sequential_rollovers(self):
+        """
+        Rolling over a range of months in one call leaves the database in the
+        same state as rolling over each month individually.
+        """
+        add_subscription(self.conn, {
+            "id": "budget_food", "name": "Food", "category": "Food",
+            "monthly_amount": 400, "payment_account_id": "Cash",
+            "start_date": date(2025, 9, 1), "is_budget": True,
+            "underspend_behavior": "return"
+        })
+        sequential = clone_connection(self.conn)
+        self.addCleanup(sequential.close)
+
+        for process_date in (date(2025, 10, 15), date(2025, 11, 15), date(2025, 12, 15)):
+            run_monthly_rollover(sequential, process_date)
+        run_monthly_rollover_range(self.conn, date(2025, 10, 15), date(2025, 12, 15))
+
+        query = "SELECT date_created, date_payed, description, amount, status FROM transactions ORDER BY id"
+        self.assertEqual(
+            [tuple(row) for row in self.conn.execute(query)],
+            [tuple(row) for row in sequential.execute(query)],
+        )
+        self.assertFalse(self.conn.in_transaction)
+
 
 if __name__ == "__main__":
     unittest.main()
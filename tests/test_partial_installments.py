@@ -40,9 +40,7 @@ class TestPartialInstallments(unittest.TestCase):
         
         self.assertEqual(len(transactions), 4, "Should create 4 transactions.")
         
-        # Sort by date_payed to ensure order
-        transactions.sort(key=lambda x: x['date_payed'])
-        
+        # get_all_transactions already returns rows ordered by date_payed
         descriptions = [t['description'] for t in transactions]
         expected_descriptions = [
             "New Phone (3/6)",
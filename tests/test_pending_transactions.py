@@ -1,21 +1,28 @@
 import unittest
-import sqlite3
 from datetime import date, timedelta
 
-from cashflow.database import create_connection, create_tables
+from cashflow.database import create_connection, create_tables, clone_connection
 from cashflow import repository
 from cashflow import controller
 from cashflow.transactions import create_single_transaction
 
 class TestPendingTransactions(unittest.TestCase):
 
-    def setUp(self):
-        """Set up a fresh, in-memory database for each test."""
-        self.conn = sqlite3.connect(":memory:", detect_types=sqlite3.PARSE_DECLTYPES)
-        self.conn.row_factory = sqlite3.Row
-        create_tables(self.conn)
+    @classmethod
+    def setUpClass(cls):
+        """Build the schema and the cash account once for the whole class."""
+        cls._template = create_connection(":memory:")
+        create_tables(cls._template)
         # Add a cash account for transactions
-        repository.add_account(self.conn, "Cash", "cash")
+        repository.add_account(cls._template, "Cash", "cash")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._template.close()
+
+    def setUp(self):
+        """Give each test a fresh copy of the prepared database."""
+        self.conn = clone_connection(self._template)
         self.cash_account = repository.get_account_by_name(self.conn, "Cash")
 
     def tearDown(self):
@@ -1,11 +1,21 @@
+import os
+import sqlite3
+import tempfile
 import unittest
+from unittest.mock import patch
 from datetime import date
 
 from cashflow.repository import (
     get_account_by_name,
     add_transactions,
     get_all_transactions,
-    add_subscription,
+    count_transactions,
+    delete_transactions,
+    get_transaction_by_description,
+    get_budget_allocation_for_month,
+    get_budget_allocations_for_months,
+    get_last_forecast_dates,
+    add_subscriptions,
     get_subscription_by_id,
     get_all_active_subscriptions,
     delete_future_budget_allocations,
@@ -13,7 +23,8 @@ from cashflow.repository import (
     get_setting,
     commit_past_and_current_forecasts,
 )
-from cashflow.database import create_test_db
+from cashflow.database import create_test_db, create_connection, transaction
+from db_test_case import RollbackTestCase
 
 
 class TestRepository(unittest.TestCase):
@@ -87,12 +98,13 @@ class TestRepository(unittest.TestCase):
                 "origin_id": "20251018-A1",
             },
         ]
-        add_transactions(self.conn, new_transactions)
+        inserted_ids = add_transactions(self.conn, new_transactions)
 
         transactions = get_all_transactions(self.conn)
         self.assertEqual(len(transactions), 2)
         self.assertEqual(transactions[0]["origin_id"], "20251018-A1")
         self.assertEqual(transactions[1]["origin_id"], "20251018-A1")
+        self.assertEqual(inserted_ids, [t["id"] for t in transactions])
 
     def test_get_all_transactions_empty(self):
         """
@@ -105,14 +117,73 @@ class TestRepository(unittest.TestCase):
         transactions = get_all_transactions(self.conn)
         self.assertEqual(len(transactions), 0)
 
+    def test_count_transactions(self):
+        """
+        Tests that the transaction count tracks inserts without fetching rows.
+        """
+        self.assertEqual(count_transactions(self.conn), 0)
+        add_transactions(self.conn, [
+            {
+                "date_created": "2025-10-18", "date_payed": "2025-10-18",
+                "description": "Coffee", "account": "Cash", "amount": -3.00,
+                "category": "cafe", "budget": None, "status": "committed",
+                "origin_id": None,
+            },
+        ])
+        self.assertEqual(count_transactions(self.conn), 1)
+
+    def test_delete_transactions(self):
+        """
+        Tests deleting a batch of transactions by id.
+        """
+        ids = add_transactions(self.conn, [
+            {
+                "date_created": "2025-10-18", "date_payed": "2025-10-18",
+                "description": description, "account": "Cash", "amount": -1.00,
+                "category": "cafe", "budget": None, "status": "committed",
+                "origin_id": None,
+            }
+            for description in ("Coffee", "Tea", "Juice")
+        ])
+
+        delete_transactions(self.conn, ids[:2])
+
+        remaining = get_all_transactions(self.conn)
+        self.assertEqual([t["description"] for t in remaining], ["Juice"])
+
+    def test_get_transaction_by_description(self):
+        """
+        Tests looking up a transaction by its exact description.
+        """
+        add_transactions(self.conn, [
+            {
+                "date_created": "2025-10-18", "date_payed": "2025-10-18",
+                "description": "Groceries", "account": "Cash", "amount": -40.00,
+                "category": "groceries", "budget": None, "status": "committed",
+                "origin_id": None,
+            },
+            {
+                "date_created": "2025-10-19", "date_payed": "2025-10-19",
+                "description": "Groceries extra", "account": "Cash", "amount": -10.00,
+                "category": "groceries", "budget": None, "status": "committed",
+                "origin_id": None,
+            },
+        ])
+
+        transaction = get_transaction_by_description(self.conn, "Groceries")
+        self.assertIsNotNone(transaction)
+        self.assertEqual(transaction["amount"], -40.00)
+        self.assertIsNone(get_transaction_by_description(self.conn, "Rent"))
 
-class TestSubscriptionRepository(unittest.TestCase):
-    def setUp(self):
-        """Set up an in-memory database for each test."""
-        self.conn = create_test_db()
+
+class TestSubscriptionRepository(RollbackTestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Set up an in-memory database shared by the class and seed it once."""
+        cls.conn = create_test_db()
 
         # Sample subscriptions
-        self.sub1 = {
+        cls.sub1 = {
             "id": "sub_spotify",
             "name": "Spotify",
             "category": "entertainment",
@@ -121,7 +192,7 @@ class TestSubscriptionRepository(unittest.TestCase):
             "start_date": date(2025, 1, 15),
             "end_date": None,
         }
-        self.sub2 = {
+        cls.sub2 = {
             "id": "sub_gym",
             "name": "Gym Membership",
             "category": "health",
@@ -130,12 +201,12 @@ class TestSubscriptionRepository(unittest.TestCase):
             "start_date": date(2025, 3, 1),
             "end_date": date(2025, 8, 31),
         }
-        add_subscription(self.conn, self.sub1)
-        add_subscription(self.conn, self.sub2)
+        add_subscriptions(cls.conn, [cls.sub1, cls.sub2])
 
-    def tearDown(self):
-        """Close the database connection after each test."""
-        self.conn.close()
+    @classmethod
+    def tearDownClass(cls):
+        """Close the shared database connection."""
+        cls.conn.close()
 
     def test_add_and_get_subscription(self):
         """Tests that a subscription can be added and retrieved by its ID."""
@@ -184,6 +255,34 @@ class TestSubscriptionRepository(unittest.TestCase):
         self.assertEqual(updated_forecasts[0]["account"], "Visa Produbanco") # Unchanged
         self.assertEqual(updated_forecasts[1]["account"], "Amex Produbanco") # Changed
 
+    def test_get_budget_allocations_for_months(self):
+        """Tests fetching a budget's allocations for several months at once."""
+        allocations = [
+            {"date_created": date(2025, m, 1), "date_payed": date(2025, m, 1), "description": "Food", "account": "Cash", "amount": -300, "category": "food", "budget": "budget_food", "status": "forecast", "origin_id": "budget_food"}
+            for m in (10, 11, 12)
+        ]
+        add_transactions(self.conn, allocations)
+
+        months = [date(2025, 10, 15), date(2025, 12, 1), date(2026, 1, 1)]
+        by_month = get_budget_allocations_for_months(self.conn, "budget_food", months)
+
+        self.assertEqual(set(by_month), {date(2025, 10, 1), date(2025, 12, 1)})  # January has none
+        for month, allocation in by_month.items():
+            self.assertEqual(allocation, get_budget_allocation_for_month(self.conn, "budget_food", month))
+        self.assertEqual(get_budget_allocations_for_months(self.conn, "budget_food", []), {})
+
+    def test_get_last_forecast_dates(self):
+        """Tests finding each subscription's latest forecast or committed row."""
+        add_transactions(self.conn, [
+            {"date_created": date(2025, 10, 15), "date_payed": date(2025, 11, 10), "description": "Spotify", "account": "Visa Produbanco", "amount": -9.99, "category": "entertainment", "budget": None, "status": "committed", "origin_id": "sub_spotify"},
+            {"date_created": date(2025, 11, 15), "date_payed": date(2025, 12, 10), "description": "Spotify", "account": "Visa Produbanco", "amount": -9.99, "category": "entertainment", "budget": None, "status": "forecast", "origin_id": "sub_spotify"},
+            # Pending rows and non-subscription origins are ignored
+            {"date_created": date(2025, 12, 15), "date_payed": date(2026, 1, 10), "description": "Spotify", "account": "Visa Produbanco", "amount": -9.99, "category": "entertainment", "budget": None, "status": "pending", "origin_id": "sub_spotify"},
+            {"date_created": date(2025, 10, 1), "date_payed": date(2025, 10, 1), "description": "TV (1/3)", "account": "Cash", "amount": -100, "category": None, "budget": None, "status": "committed", "origin_id": "20251001-ABCD"},
+        ])
+
+        self.assertEqual(get_last_forecast_dates(self.conn), {"sub_spotify": date(2025, 11, 15)})
+
 
 class TestSettingsRepository(unittest.TestCase):
     def setUp(self):
@@ -236,5 +335,140 @@ class TestSettingsRepository(unittest.TestCase):
         self.assertEqual(status_map['D'], 'committed')  # Already committed → unchanged
 
 
+class TestTransactionBlock(unittest.TestCase):
+    def setUp(self):
+        """Set up an in-memory database for each test."""
+        self.conn = create_test_db()
+        self.transaction = {
+            "date_created": "2025-10-17", "date_payed": "2025-10-17",
+            "description": "Coffee", "account": "Cash", "amount": -5.00,
+            "category": "cafe", "budget": None, "status": "committed",
+            "origin_id": None,
+        }
+
+    def tearDown(self):
+        """Close the database connection after each test."""
+        self.conn.close()
+
+    def test_commits_once_on_exit(self):
+        """Repository commits inside the block are deferred to its end."""
+        with transaction(self.conn):
+            add_transactions(self.conn, [self.transaction])
+            self.assertTrue(self.conn.in_transaction)
+        self.assertFalse(self.conn.in_transaction)
+        self.assertEqual(len(get_all_transactions(self.conn)), 1)
+
+    def test_rolls_back_on_error(self):
+        """An exception inside the block discards all of its writes."""
+        with self.assertRaises(RuntimeError):
+            with transaction(self.conn):
+                add_transactions(self.conn, [self.transaction])
+                raise RuntimeError("boom")
+        self.assertEqual(get_all_transactions(self.conn), [])
+
+    def test_rollback_requested(self):
+        """rollback=True discards the writes even when the block succeeds."""
+        with transaction(self.conn, rollback=True):
+            add_transactions(self.conn, [self.transaction])
+            with transaction(self.conn):
+                add_transactions(self.conn, [self.transaction])
+        self.assertEqual(get_all_transactions(self.conn), [])
+
+    def test_nested_rollback_discards_only_inner_writes(self):
+        """rollback=True on a nested block keeps the outer block's writes."""
+        with transaction(self.conn):
+            add_transactions(self.conn, [self.transaction])
+            with transaction(self.conn, rollback=True):
+                add_transactions(self.conn, [self.transaction])
+        self.assertEqual(len(get_all_transactions(self.conn)), 1)
+
+    def test_caught_inner_error_discards_only_inner_writes(self):
+        """A nested block that raises is undone even if the outer block goes on."""
+        with transaction(self.conn):
+            add_transactions(self.conn, [self.transaction])
+            try:
+                with transaction(self.conn):
+                    add_transactions(self.conn, [self.transaction])
+                    raise RuntimeError("boom")
+            except RuntimeError:
+                pass
+            add_transactions(self.conn, [self.transaction])
+        self.assertEqual(len(get_all_transactions(self.conn)), 2)
+
+    def test_outer_error_discards_committed_inner_block(self):
+        """An error in the outer block also undoes nested blocks that finished."""
+        with self.assertRaises(RuntimeError):
+            with transaction(self.conn):
+                with transaction(self.conn):
+                    add_transactions(self.conn, [self.transaction])
+                raise RuntimeError("boom")
+        self.assertEqual(get_all_transactions(self.conn), [])
+        self.assertEqual(self.conn.transaction_depth, 0)
+
+    def test_rejects_plain_sqlite_connection(self):
+        """Connections not opened by create_connection() raise a clear error."""
+        plain = sqlite3.connect(":memory:")
+        self.addCleanup(plain.close)
+        with self.assertRaisesRegex(TypeError, "create_connection"):
+            with transaction(plain):
+                pass
+
+
+class TestConnectionTuning(unittest.TestCase):
+    def test_in_memory_connections_skip_syncing(self):
+        """In-memory connections, cloned or not, run without syncing to disk."""
+        for conn in (create_connection(":memory:"), create_test_db()):
+            self.addCleanup(conn.close)
+            self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 0)
+            self.assertEqual(conn.execute("PRAGMA temp_store").fetchone()[0], 2)
+
+    def _open_on_disk(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        conn = create_connection(os.path.join(tmp_dir.name, "cash_flow.db"))
+        self.addCleanup(conn.close)
+        return conn
+
+    def test_on_disk_connections_keep_rollback_journal_by_default(self):
+        """On-disk connections leave the journal mode alone unless WAL is enabled."""
+        with patch("cashflow.database.config.DB_WAL_ENABLED", False):
+            conn = self._open_on_disk()
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "delete")
+        self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 2)
+
+    def test_disabling_wal_switches_the_file_back(self):
+        """A file left in WAL mode returns to the rollback journal when WAL is off."""
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        db_path = os.path.join(tmp_dir.name, "cash_flow.db")
+        with patch("cashflow.database.config.DB_WAL_ENABLED", True):
+            create_connection(db_path).close()
+        with patch("cashflow.database.config.DB_WAL_ENABLED", False):
+            conn = create_connection(db_path)
+        self.addCleanup(conn.close)
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "delete")
+
+    def test_disabling_wal_waits_for_other_connections(self):
+        """The switch back is skipped, not an error, while WAL is still in use."""
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        db_path = os.path.join(tmp_dir.name, "cash_flow.db")
+        with patch("cashflow.database.config.DB_WAL_ENABLED", True):
+            wal_conn = create_connection(db_path)
+        self.addCleanup(wal_conn.close)
+        wal_conn.execute("CREATE TABLE t (x INTEGER)")
+        wal_conn.commit()
+        with patch("cashflow.database.config.DB_WAL_ENABLED", False):
+            conn = create_connection(db_path)
+        self.addCleanup(conn.close)
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+
+    def test_on_disk_connections_use_wal_when_enabled(self):
+        """With DB_WAL_ENABLED, on-disk connections use WAL with NORMAL syncing."""
+        with patch("cashflow.database.config.DB_WAL_ENABLED", True):
+            conn = self._open_on_disk()
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 1)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
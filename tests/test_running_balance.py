@@ -47,27 +47,18 @@ class TestRunningBalance(unittest.TestCase):
         # --- Action: Get transactions with running balance ---
         all_transactions = get_transactions_with_running_balance(self.conn)
 
-        print("\n--- Debug: All Transactions Before Filtering ---")
-        for t in all_transactions:
-            print(f"  - Desc: {t['description']}, Amount: {t['amount']:.2f}")
-        print("--------------------------------------------")
-
         # Filter for only the transactions relevant to this test
-        print("\n--- Debug: Filtering Transactions ---")
+        wanted = frozenset({"Movie ticket", "Groceries"})
         transactions = [
-            t for t in all_transactions 
-            if print(f"Checking: {t['description']} ({t['status']})") or
-               t['description'] == "Movie ticket" or 
-               t['description'] == "Groceries" or
-               (t['description'] == "Food Budget" and t['status'] == 'committed')
+            t for t in all_transactions
+            if t['description'] in wanted
+            or (t['description'] == "Food Budget" and t['status'] == 'committed')
         ]
-        print("-----------------------------------")
         
         # --- Verification ---
         self.assertEqual(len(transactions), 3, "Should be 3 relevant transactions.")
         
-        # Sort by date_payed to ensure order
-        transactions.sort(key=lambda x: x['date_payed'])
+        # Rows already come back ordered by date_payed
 
         # Expected balances based on simple cumulative sum of the 'amount' column.
         # The Food Budget's amount is -320 because the 80 from Groceries was added back to it.
@@ -1,12 +1,11 @@
 
 import unittest
-from unittest.mock import patch
 from datetime import date
 from dateutil.relativedelta import relativedelta
 
 from cashflow.controller import generate_forecasts
 from cashflow.database import create_test_db
-from cashflow.repository import add_subscription, get_all_transactions, add_transactions
+from cashflow.repository import add_subscription, get_all_transactions, add_transactions, count_transactions
 
 class TestScheduler(unittest.TestCase):
     def setUp(self):
@@ -31,16 +30,15 @@ class TestScheduler(unittest.TestCase):
         """Close the database connection after each test."""
         self.conn.close()
 
-    @patch('cashflow.controller.date')
-    def test_generate_forecasts_initial_creation(self, mock_date):
+    def test_generate_forecasts_initial_creation(self):
         """
         Tests that forecasts are created correctly for a new subscription.
         """
         # Pin 'today' to a specific date for predictable results
-        mock_date.today.return_value = date(2025, 1, 1)
+        today = date(2025, 1, 1)
         add_subscription(self.conn, self.sub_indefinite)
 
-        generate_forecasts(self.conn, horizon_months=3)
+        generate_forecasts(self.conn, horizon_months=3, from_date=today)
 
         transactions = get_all_transactions(self.conn)
         # Should generate for Jan, Feb, Mar
@@ -48,12 +46,11 @@ class TestScheduler(unittest.TestCase):
         self.assertEqual(transactions[0]['origin_id'], 'sub_spotify')
         self.assertEqual(transactions[2]['date_created'], date(2025, 3, 15))
 
-    @patch('cashflow.controller.date')
-    def test_generate_forecasts_extends_existing(self, mock_date):
+    def test_generate_forecasts_extends_existing(self):
         """
         Tests that generate_forecasts only adds missing future forecasts.
         """
-        mock_date.today.return_value = date(2025, 2, 1)
+        today = date(2025, 2, 1)
         add_subscription(self.conn, self.sub_indefinite)
         
         # Pre-add a forecast for Feb
@@ -66,7 +63,7 @@ class TestScheduler(unittest.TestCase):
         add_transactions(self.conn, [existing_forecast])
 
         # Horizon is 3 months: Feb, Mar, Apr
-        generate_forecasts(self.conn, horizon_months=3)
+        generate_forecasts(self.conn, horizon_months=3, from_date=today)
 
         transactions = get_all_transactions(self.conn)
         # Should have the existing Feb forecast + new ones for Mar, Apr
@@ -74,38 +71,34 @@ class TestScheduler(unittest.TestCase):
         # Check that the last one is for April
         self.assertEqual(transactions[2]['date_created'], date(2025, 4, 15))
 
-    @patch('cashflow.controller.date')
-    def test_generate_forecasts_respects_end_date(self, mock_date):
+    def test_generate_forecasts_respects_end_date(self):
         """
         Tests that forecasts are not created after a subscription's end_date.
         """
-        mock_date.today.return_value = date(2025, 1, 1)
+        today = date(2025, 1, 1)
         add_subscription(self.conn, self.sub_limited)
 
         # Horizon is 6 months, but subscription ends in March
-        generate_forecasts(self.conn, horizon_months=6)
+        generate_forecasts(self.conn, horizon_months=6, from_date=today)
 
         transactions = get_all_transactions(self.conn)
         # Should only generate for Jan, Feb, Mar
         self.assertEqual(len(transactions), 3)
         self.assertEqual(transactions[2]['date_created'], date(2025, 3, 1))
 
-    @patch('cashflow.controller.date')
-    def test_generate_forecasts_no_duplicates(self, mock_date):
+    def test_generate_forecasts_no_duplicates(self):
         """
         Tests that running the function multiple times doesn't create duplicates.
         """
-        mock_date.today.return_value = date(2025, 1, 1)
+        today = date(2025, 1, 1)
         add_subscription(self.conn, self.sub_indefinite)
 
-        generate_forecasts(self.conn, horizon_months=2)
-        transactions = get_all_transactions(self.conn)
-        self.assertEqual(len(transactions), 2)
+        generate_forecasts(self.conn, horizon_months=2, from_date=today)
+        self.assertEqual(count_transactions(self.conn), 2)
 
         # Run it again with the same horizon
-        generate_forecasts(self.conn, horizon_months=2)
-        transactions = get_all_transactions(self.conn)
-        self.assertEqual(len(transactions), 2)
+        generate_forecasts(self.conn, horizon_months=2, from_date=today)
+        self.assertEqual(count_transactions(self.conn), 2)
 
 if __name__ == '__main__':
     unittest.main()
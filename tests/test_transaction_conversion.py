@@ -1,48 +1,61 @@
 import unittest
+from unittest.mock import patch
 from datetime import date
 from dateutil.relativedelta import relativedelta
 
-from cashflow.database import create_test_db
-from cashflow.repository import add_subscription, add_transactions, get_budget_allocation_for_month, get_all_transactions
+from cashflow.database import create_test_db, clone_connection, transaction
+from cashflow.repository import (
+    add_subscription, add_transactions, get_budget_allocation_for_month,
+    get_all_transactions, get_transaction_by_description
+)
 from cashflow.controller import _get_transaction_group_info, process_transaction_request, process_transaction_conversion
 
 
 class TestTransactionGroupIdentifier(unittest.TestCase):
-    def setUp(self):
-        """Set up a database with all types of transactions."""
-        self.conn = create_test_db()
-        self.today = date(2025, 10, 15)
+    @classmethod
+    def setUpClass(cls):
+        """Build a database with all types of transactions once for the class."""
+        cls._template = create_test_db()
+        cls.today = date(2025, 10, 15)
 
         # 1. Simple Transaction (no origin_id)
-        add_transactions(self.conn, [{
-            "date_created": self.today, "date_payed": self.today, "description": "Simple Meal",
+        add_transactions(cls._template, [{
+            "date_created": cls.today, "date_payed": cls.today, "description": "Simple Meal",
             "account": "Cash", "amount": -20, "category": "Home Groceries", "budget": None,
             "status": "committed", "origin_id": None
         }])
-        self.simple_tx_id = 1
+        cls.simple_tx_id = 1
 
         # 2. Split Transaction (shared origin_id, same date_payed)
-        add_transactions(self.conn, [
-            {"date_created": self.today, "date_payed": self.today, "description": "Groceries", "account": "Cash", "amount": -80, "category": "Home Groceries", "budget": None, "status": "committed", "origin_id": "SPLIT1"},
-            {"date_created": self.today, "date_payed": self.today, "description": "Groceries", "account": "Cash", "amount": -15, "category": "Housing", "budget": None, "status": "committed", "origin_id": "SPLIT1"}
+        add_transactions(cls._template, [
+            {"date_created": cls.today, "date_payed": cls.today, "description": "Groceries", "account": "Cash", "amount": -80, "category": "Home Groceries", "budget": None, "status": "committed", "origin_id": "SPLIT1"},
+            {"date_created": cls.today, "date_payed": cls.today, "description": "Groceries", "account": "Cash", "amount": -15, "category": "Housing", "budget": None, "status": "committed", "origin_id": "SPLIT1"}
         ])
-        self.split_tx_id = 2
+        cls.split_tx_id = 2
 
         # 3. Installment Transaction (shared origin_id, different date_payed)
-        add_transactions(self.conn, [
-            {"date_created": self.today, "date_payed": self.today, "description": "Phone (1/3)", "account": "Visa Produbanco", "amount": -100, "category": "Others", "budget": None, "status": "committed", "origin_id": "INSTALL1"},
-            {"date_created": self.today, "date_payed": self.today + relativedelta(months=1), "description": "Phone (2/3)", "account": "Visa Produbanco", "amount": -100, "category": "Others", "budget": None, "status": "committed", "origin_id": "INSTALL1"}
+        add_transactions(cls._template, [
+            {"date_created": cls.today, "date_payed": cls.today, "description": "Phone (1/3)", "account": "Visa Produbanco", "amount": -100, "category": "Others", "budget": None, "status": "committed", "origin_id": "INSTALL1"},
+            {"date_created": cls.today, "date_payed": cls.today + relativedelta(months=1), "description": "Phone (2/3)", "account": "Visa Produbanco", "amount": -100, "category": "Others", "budget": None, "status": "committed", "origin_id": "INSTALL1"}
         ])
-        self.installment_tx_id = 4
+        cls.installment_tx_id = 4
 
         # 4. Subscription Transaction (origin_id matches a subscription)
-        add_subscription(self.conn, {"id": "sub_netflix", "name": "Netflix", "category": "Personal", "monthly_amount": 15.99, "payment_account_id": "Visa Produbanco", "start_date": self.today})
-        add_transactions(self.conn, [{
-            "date_created": self.today, "date_payed": self.today, "description": "Netflix",
+        add_subscription(cls._template, {"id": "sub_netflix", "name": "Netflix", "category": "Personal", "monthly_amount": 15.99, "payment_account_id": "Visa Produbanco", "start_date": cls.today})
+        add_transactions(cls._template, [{
+            "date_created": cls.today, "date_payed": cls.today, "description": "Netflix",
             "account": "Visa Produbanco", "amount": -15.99, "category": "Personal", "budget": None,
             "status": "committed", "origin_id": "sub_netflix"
         }])
-        self.subscription_tx_id = 6
+        cls.subscription_tx_id = 6
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._template.close()
+
+    def setUp(self):
+        """Give each test its own copy of the prepared database."""
+        self.conn = clone_connection(self._template)
 
     def tearDown(self):
         self.conn.close()
@@ -79,21 +92,24 @@ class TestTransactionConversions(unittest.TestCase):
         self.conn = create_test_db()
 
         self.start_date = date(2025, 9, 15)
+        # The start month and the two after it, whose budgets the tests read
+        self.months = [self.start_date + relativedelta(months=i) for i in range(3)]
         self.budget_id = "budget_shopping"
 
-        # 1. Create a Shopping budget
-        add_subscription(self.conn, {
-            "id": self.budget_id, "name": "Shopping Budget", "category": "Others",
-            "monthly_amount": 300.00, "payment_account_id": "Cash",
-            "start_date": self.start_date.replace(day=1), "is_budget": True
-        })
-
-        # 2. Create a budget allocation for the month of the transaction
-        add_transactions(self.conn, [{
-            "date_created": self.start_date.replace(day=1), "date_payed": self.start_date.replace(day=1),
-            "description": "Shopping Budget", "account": "Cash", "amount": -300,
-            "category": "Others", "budget": self.budget_id, "status": "committed", "origin_id": self.budget_id
-        }])
+        with transaction(self.conn):
+            # 1. Create a Shopping budget
+            add_subscription(self.conn, {
+                "id": self.budget_id, "name": "Shopping Budget", "category": "Others",
+                "monthly_amount": 300.00, "payment_account_id": "Cash",
+                "start_date": self.start_date.replace(day=1), "is_budget": True
+            })
+
+            # 2. Create a budget allocation for the month of the transaction
+            add_transactions(self.conn, [{
+                "date_created": self.start_date.replace(day=1), "date_payed": self.start_date.replace(day=1),
+                "description": "Shopping Budget", "account": "Cash", "amount": -300,
+                "category": "Others", "budget": self.budget_id, "status": "committed", "origin_id": self.budget_id
+            }])
 
     def tearDown(self):
         self.conn.close()
@@ -112,12 +128,12 @@ class TestTransactionConversions(unittest.TestCase):
         process_transaction_request(self.conn, simple_req, transaction_date=self.start_date)
         
         # Verify initial budget impact
-        budget_before = get_budget_allocation_for_month(self.conn, self.budget_id, self.start_date)
+        budget_before = get_budget_allocation_for_month(self.conn, self.budget_id, self.months[0])
         self.assertAlmostEqual(budget_before['amount'], -180.00) # -300 + 120
 
         # --- STEP 2: Conversion ---
         # Find the transaction to convert
-        tx_to_convert = next(t for t in get_all_transactions(self.conn) if t['description'] == "Single Purchase")
+        tx_to_convert = get_transaction_by_description(self.conn, "Single Purchase")
         
         conversion_details = {
             "target_type": "installment",
@@ -134,17 +150,17 @@ class TestTransactionConversions(unittest.TestCase):
 
         # --- STEP 3: Verification ---
         # 1. The original transaction should be gone
-        original_gone = all(t['description'] != "Single Purchase" for t in get_all_transactions(self.conn))
-        self.assertTrue(original_gone, "The original simple transaction was not deleted.")
+        self.assertIsNone(get_transaction_by_description(self.conn, "Single Purchase"),
+                          "The original simple transaction was not deleted.")
 
         # 2. Three new installment transactions should exist
         installments = [t for t in get_all_transactions(self.conn) if "Converted to Installments" in t['description']]
         self.assertEqual(len(installments), 3, "Incorrect number of installment transactions created.")
 
         # 3. Verify budget recalculations
-        budget_month1 = get_budget_allocation_for_month(self.conn, self.budget_id, self.start_date)
-        budget_month2 = get_budget_allocation_for_month(self.conn, self.budget_id, self.start_date + relativedelta(months=1))
-        budget_month3 = get_budget_allocation_for_month(self.conn, self.budget_id, self.start_date + relativedelta(months=2))
+        budget_month1 = get_budget_allocation_for_month(self.conn, self.budget_id, self.months[0])
+        budget_month2 = get_budget_allocation_for_month(self.conn, self.budget_id, self.months[1])
+        budget_month3 = get_budget_allocation_for_month(self.conn, self.budget_id, self.months[2])
 
         # The original budget should be restored and then debited by the new, smaller amount
         self.assertAlmostEqual(budget_month1['amount'], -260.00, msg="Budget for month 1 is incorrect.") # -300 + 40
@@ -170,9 +186,9 @@ class TestTransactionConversions(unittest.TestCase):
         process_transaction_request(self.conn, installment_req, transaction_date=self.start_date)
 
         # Verify initial state for all three affected months
-        budget1_before = get_budget_allocation_for_month(self.conn, self.budget_id, self.start_date)
-        budget2_before = get_budget_allocation_for_month(self.conn, self.budget_id, self.start_date + relativedelta(months=1))
-        budget3_before = get_budget_allocation_for_month(self.conn, self.budget_id, self.start_date + relativedelta(months=2))
+        budget1_before = get_budget_allocation_for_month(self.conn, self.budget_id, self.months[0])
+        budget2_before = get_budget_allocation_for_month(self.conn, self.budget_id, self.months[1])
+        budget3_before = get_budget_allocation_for_month(self.conn, self.budget_id, self.months[2])
         
         self.assertAlmostEqual(budget1_before['amount'], -250.00) # -300 + 50
         self.assertIsNotNone(budget2_before)
@@ -181,7 +197,7 @@ class TestTransactionConversions(unittest.TestCase):
         self.assertAlmostEqual(budget3_before['amount'], -250.00) # -300 + 50
 
         # --- STEP 2: Conversion ---
-        tx_to_convert = next(t for t in get_all_transactions(self.conn) if "Installment Purchase" in t['description'])
+        tx_to_convert = get_transaction_by_description(self.conn, "Installment Purchase (1/3)")
         
         conversion_details = {
             "target_type": "simple",
@@ -195,18 +211,19 @@ class TestTransactionConversions(unittest.TestCase):
 
         # --- STEP 3: Verification ---
         # 1. The installment transactions should be gone
-        installments_gone = all("Installment Purchase" not in t['description'] for t in get_all_transactions(self.conn))
+        remaining = get_all_transactions(self.conn)
+        installments_gone = all("Installment Purchase" not in t['description'] for t in remaining)
         self.assertTrue(installments_gone, "The original installment transactions were not deleted.")
 
         # 2. One new simple transaction should exist
-        simple_tx = [t for t in get_all_transactions(self.conn) if t['description'] == "Converted to Simple"]
+        simple_tx = [t for t in remaining if t['description'] == "Converted to Simple"]
         self.assertEqual(len(simple_tx), 1, "Incorrect number of simple transactions created.")
         self.assertEqual(simple_tx[0]['date_created'], self.start_date)
 
         # 3. Verify budget recalculations
-        budget1_after = get_budget_allocation_for_month(self.conn, self.budget_id, self.start_date)
-        budget2_after = get_budget_allocation_for_month(self.conn, self.budget_id, self.start_date + relativedelta(months=1))
-        budget3_after = get_budget_allocation_for_month(self.conn, self.budget_id, self.start_date + relativedelta(months=2))
+        budget1_after = get_budget_allocation_for_month(self.conn, self.budget_id, self.months[0])
+        budget2_after = get_budget_allocation_for_month(self.conn, self.budget_id, self.months[1])
+        budget3_after = get_budget_allocation_for_month(self.conn, self.budget_id, self.months[2])
 
         # The first month's budget should reflect the full single payment
         self.assertAlmostEqual(budget1_after['amount'], -150.00, msg="Budget for month 1 is incorrect.") # -300 + 150
@@ -215,14 +232,44 @@ class TestTransactionConversions(unittest.TestCase):
         self.assertAlmostEqual(budget2_after['amount'], -300.00, msg="Budget for month 2 was not restored.")
         self.assertAlmostEqual(budget3_after['amount'], -300.00, msg="Budget for month 3 was not restored.")
 
+    def test_failed_conversion_keeps_original_transaction(self):
+        """
+        Tests that a conversion failing after the old rows were deleted leaves
+        the original transaction and its budget allocation untouched.
+        """
+        simple_req = {
+            "type": "simple", "description": "Single Purchase", "amount": 120.00,
+            "account": "Cash", "budget": self.budget_id
+        }
+        process_transaction_request(self.conn, simple_req, transaction_date=self.start_date)
+        tx_to_convert = get_transaction_by_description(self.conn, "Single Purchase")
+
+        conversion_details = {
+            "target_type": "installment",
+            "description": "Converted to Installments",
+            "total_amount": 120.00,
+            "installments": 3,
+            "account": "Cash",
+            "category": "Others",
+            "budget": self.budget_id
+        }
+        with patch("cashflow.controller.process_transaction_request",
+                   side_effect=RuntimeError("re-insert failed")):
+            with self.assertRaises(RuntimeError):
+                process_transaction_conversion(self.conn, tx_to_convert['id'], conversion_details)
+
+        self.assertEqual(get_transaction_by_description(self.conn, "Single Purchase"), tx_to_convert)
+        budget = get_budget_allocation_for_month(self.conn, self.budget_id, self.months[0])
+        self.assertAlmostEqual(budget['amount'], -180.00)
+
     def test_add_retroactive_transaction_updates_past_budget(self):
         """
         Tests that adding a new transaction to a past, committed month correctly
         recalculates and updates the budget for that month.
         """
         # --- STEP 1: Initial State ---
-        # The budget for self.start_date (September) is -300.
-        budget_before = get_budget_allocation_for_month(self.conn, self.budget_id, self.start_date)
+        # The budget for self.months[0] (September) is -300.
+        budget_before = get_budget_allocation_for_month(self.conn, self.budget_id, self.months[0])
         self.assertAlmostEqual(budget_before['amount'], -300.00)
 
         # --- STEP 2: Action ---
@@ -234,7 +281,7 @@ class TestTransactionConversions(unittest.TestCase):
         process_transaction_request(self.conn, retroactive_req, transaction_date=self.start_date)
 
         # --- STEP 3: Verification ---
-        budget_after = get_budget_allocation_for_month(self.conn, self.budget_id, self.start_date)
+        budget_after = get_budget_allocation_for_month(self.conn, self.budget_id, self.months[0])
         self.assertAlmostEqual(budget_after['amount'], -225.00, msg="Retroactive addition did not update past budget.") # -300 + 75
 
     def test_prevent_invalid_conversions(self):
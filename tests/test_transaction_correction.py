@@ -1,40 +1,45 @@
 import unittest
 from datetime import date
-from unittest.mock import patch
 from dateutil.relativedelta import relativedelta
 
-from cashflow.database import create_test_db
+from cashflow.database import create_test_db, clone_connection, transaction
 from cashflow.repository import (
-    add_subscription, get_budget_allocation_for_month, get_all_transactions
+    add_subscription, get_budget_allocation_for_month, get_transaction_by_description
 )
 from cashflow.controller import (
-    process_transaction_request, process_transaction_deletion, run_monthly_rollover
+    process_transaction_request, process_transaction_deletion, run_monthly_rollover_range
 )
 
 class TestTransactionCorrection(unittest.TestCase):
-    def setUp(self):
-        """Set up an in-memory database for the correction scenario."""
-        self.conn = create_test_db()
-        
+    @classmethod
+    def setUpClass(cls):
+        """Build the rolled-over correction scenario once for the whole class."""
+        cls._template = create_test_db()
+
         # We are operating in October, but will correct a transaction from September
-        self.today = date(2025, 10, 5)
-        self.september = self.today - relativedelta(months=1)
-        self.october = self.today
-        self.november = self.today + relativedelta(months=1)
-
-        # 1. Create a Shopping budget
-        self.budget_id = "budget_shopping"
-        add_subscription(self.conn, {
-            "id": self.budget_id, "name": "Shopping Budget", "category": "Shopping",
-            "monthly_amount": 200.00, "payment_account_id": "Cash",
-            "start_date": self.september.replace(day=1), "is_budget": True
-        })
-
-        # 2. Generate forecasts and commit September and October
-        with patch('cashflow.controller.date') as mock_date:
-            mock_date.today.return_value = self.today
-            run_monthly_rollover(self.conn, self.september)
-            run_monthly_rollover(self.conn, self.october)
+        cls.today = date(2025, 10, 5)
+        cls.september = cls.today - relativedelta(months=1)
+        cls.october = cls.today
+        cls.november = cls.today + relativedelta(months=1)
+
+        # 1. Create a Shopping budget, then 2. generate forecasts and commit
+        #    September and October, all as one transaction
+        cls.budget_id = "budget_shopping"
+        with transaction(cls._template):
+            add_subscription(cls._template, {
+                "id": cls.budget_id, "name": "Shopping Budget", "category": "Shopping",
+                "monthly_amount": 200.00, "payment_account_id": "Cash",
+                "start_date": cls.september.replace(day=1), "is_budget": True
+            })
+            run_monthly_rollover_range(cls._template, cls.september, cls.october)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._template.close()
+
+    def setUp(self):
+        """Give each test its own copy of the prepared database."""
+        self.conn = clone_connection(self._template)
 
     def tearDown(self):
         """Close the database connection."""
@@ -54,10 +59,8 @@ class TestTransactionCorrection(unittest.TestCase):
             "type": "simple", "description": "Mistake Purchase", "amount": 90.00,
             "account": "Cash", "budget": self.budget_id
         }
-        # We patch 'today' to be in September for the creation of this transaction
-        with patch('cashflow.controller.date') as mock_date:
-            mock_date.today.return_value = self.september
-            process_transaction_request(self.conn, incorrect_expense_req)
+        # The transaction is dated in September
+        process_transaction_request(self.conn, incorrect_expense_req, transaction_date=self.september)
 
         # Verification of initial state
         sept_budget_before = get_budget_allocation_for_month(self.conn, self.budget_id, self.september)
@@ -67,7 +70,7 @@ class TestTransactionCorrection(unittest.TestCase):
         # --- STEP 2: Deletion ---
         print("\nSTEP 2: Deleting the incorrect transaction")
         # Find the transaction we just created
-        tx_to_delete = next(t for t in get_all_transactions(self.conn) if t['description'] == "Mistake Purchase")
+        tx_to_delete = get_transaction_by_description(self.conn, "Mistake Purchase")
         process_transaction_deletion(self.conn, tx_to_delete['id'])
 
         # Verification of deletion
@@ -83,9 +86,7 @@ class TestTransactionCorrection(unittest.TestCase):
             "installments": 3, "account": "Cash", "budget": self.budget_id
         }
         # The purchase date is still in September
-        with patch('cashflow.controller.date') as mock_date:
-            mock_date.today.return_value = self.september
-            process_transaction_request(self.conn, correct_installment_req)
+        process_transaction_request(self.conn, correct_installment_req, transaction_date=self.september)
 
         # --- STEP 4: Final Verification ---
         print("\nSTEP 4: Final State Verification")
@@ -1,5 +1,6 @@
 import unittest
 from datetime import date, timedelta
+from types import MappingProxyType
 
 from cashflow.transactions import (
     create_single_transaction,
@@ -7,20 +8,24 @@ from cashflow.transactions import (
     create_split_transactions,
     create_recurrent_transactions,
     _calculate_credit_card_payment_date,
+    _add_months,
 )
 
 
+# Shared, read-only account fixtures
+_CASH_ACCOUNT = MappingProxyType({"account_id": "Cash", "account_type": "cash"})
+_CREDIT_CARD_ACCOUNT = MappingProxyType({
+    "account_id": "Visa Produbanco",
+    "account_type": "credit_card",
+    "cut_off_day": 15,
+    "payment_day": 25,
+})
+
+
 class TestTransactions(unittest.TestCase):
-    def setUp(self):
-        """Set up common test data."""
-        self.cash_account = {"account_id": "Cash", "account_type": "cash"}
-        self.credit_card_account = {
-            "account_id": "Visa Produbanco",
-            "account_type": "credit_card",
-            "cut_off_day": 15,
-            "payment_day": 25,
-        }
-        self.transaction_date = date(2025, 10, 17)
+    cash_account = _CASH_ACCOUNT
+    credit_card_account = _CREDIT_CARD_ACCOUNT
+    transaction_date = date(2025, 10, 17)
 
     def test_create_single_transaction_cash(self):
         """
@@ -159,6 +164,17 @@ class TestTransactions(unittest.TestCase):
             date(2026, 2, 10),
         )
 
+    def test_add_months(self):
+        """
+        Tests shifting dates by whole months, including end-of-month clamping.
+        """
+        self.assertEqual(_add_months(date(2025, 10, 17), 2), date(2025, 12, 17))
+        # Crosses a year boundary
+        self.assertEqual(_add_months(date(2025, 11, 5), 3), date(2026, 2, 5))
+        # Day 31 clamps to the end of a shorter month, including leap years
+        self.assertEqual(_add_months(date(2024, 1, 31), 1), date(2024, 2, 29))
+        self.assertEqual(_add_months(date(2025, 3, 31), -1), date(2025, 2, 28))
+
     def test_create_recurrent_transactions(self):
         """
         Tests generating forecast transactions for a subscription over a period.
@@ -215,6 +231,30 @@ class TestTransactions(unittest.TestCase):
         self.assertEqual(len(transactions), 1)
         self.assertEqual(transactions[0]["budget"], "budget_food")
 
+    def test_create_recurrent_transactions_late_start_keeps_last_month(self):
+        """
+        Tests that a period starting late in a month still covers its last
+        month when that month's forecast falls inside the period.
+        """
+        subscription = {
+            "id": "sub_rent",
+            "name": "Rent",
+            "category": "housing",
+            "monthly_amount": 500,
+            "start_date": date(2025, 1, 5),
+            "is_budget": False,
+        }
+        start_period = date(2025, 10, 20)
+        end_period = date(2025, 12, 10)
+
+        transactions = create_recurrent_transactions(
+            subscription, self.cash_account, start_period, end_period
+        )
+        self.assertEqual(
+            [t["date_created"] for t in transactions],
+            [date(2025, 11, 5), date(2025, 12, 5)],
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file